@@ -62,6 +62,13 @@ import requests
 from requests.adapters import HTTPAdapter
 from requests.packages.urllib3.util.retry import Retry
 import time
+import gzip
+
+# zstd es opcional, si no está instalado se comprime con gzip.
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 #######################################
 # #             Variables           # #
@@ -78,18 +85,40 @@ class ApiConnection:
     API_TOKEN = os.getenv("API_TOKEN")
     DEBUG = os.getenv("DEBUG") == "True"
 
+    # Límites para cada lote en la subida masiva (tuplas y bytes de JSON)
+    API_BATCH_ROWS = int(os.getenv("API_BATCH_ROWS", 100))
+    API_BATCH_BYTES = int(os.getenv("API_BATCH_BYTES", 256 * 1024))
+
+    # Tamaño del pool de conexiones keep-alive de la sesión HTTP
+    API_POOL_CONNECTIONS = int(os.getenv("API_POOL_CONNECTIONS", 1))
+    API_POOL_MAXSIZE = int(os.getenv("API_POOL_MAXSIZE", 4))
+
+    # Compresión del cuerpo de las peticiones: none, gzip o zstd
+    API_COMPRESSION = os.getenv("API_COMPRESSION", "none")
+
+    # Cuerpos más pequeños que este tamaño se envían sin comprimir
+    API_COMPRESSION_MIN_BYTES = int(os.getenv("API_COMPRESSION_MIN_BYTES",
+                                              1024))
+
+    # Sesión HTTP reutilizada entre peticiones, se crea al primer uso.
+    session = None
+
     def requests_retry_session(
             self,
             retries=3,
             backoff_factor=0.3,
             status_forcelist=(500, 502, 504),
             session=None,
+            pool_connections=1,
+            pool_maxsize=4,
     ):
         """
         Crea una sesión para reintentar envío HTTP cuando falla.
         :param backoff_factor:
         :param status_forcelist:
         :param session:
+        :param pool_connections: Cantidad de hosts con pool propio.
+        :param pool_maxsize: Conexiones keep-alive guardadas por host.
         :return:
         """
         session = session or requests.Session()
@@ -102,18 +131,67 @@ class ApiConnection:
             status_forcelist=status_forcelist,
         )
 
-        adapter = HTTPAdapter(max_retries=retry)
+        adapter = HTTPAdapter(max_retries=retry,
+                              pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize)
         session.mount('http://', adapter)
         session.mount('https://', adapter)
 
         return session
 
-    def send(self, path, datas_json, method):
+    def get_session(self):
         """
-        Envía la petición a la API.
+        Devuelve la sesión HTTP persistente, creándola si aún no existe o
+        si se descartó tras un error, para reutilizar conexiones TCP/TLS.
+        :return:
+        """
+        if self.session is None:
+            if self.DEBUG:
+                print('Creando sesión HTTP persistente')
+
+            self.session = self.requests_retry_session(
+                pool_connections=self.API_POOL_CONNECTIONS,
+                pool_maxsize=self.API_POOL_MAXSIZE,
+            )
+
+        return self.session
+
+    def close_session(self):
+        """
+        Cierra la sesión HTTP y sus conexiones, se recreará al volver a usarse.
+        """
+        if self.session is not None:
+            try:
+                self.session.close()
+            finally:
+                self.session = None
+
+    def compress_body(self, datas_json):
+        """
+        Comprime el cuerpo de la petición según API_COMPRESSION cuando supera
+        API_COMPRESSION_MIN_BYTES.
+        :param datas_json: Cuerpo en JSON (str o bytes).
+        :return: Tupla (cuerpo, Content-Encoding o None si no se comprime)
+        """
+        body = datas_json.encode('utf-8') if isinstance(datas_json, str) \
+            else datas_json
+
+        compression = (self.API_COMPRESSION or 'none').lower()
+
+        if compression == 'none' or len(body) < self.API_COMPRESSION_MIN_BYTES:
+            return body, None
+
+        if compression == 'zstd' and zstandard is not None:
+            return zstandard.ZstdCompressor().compress(body), 'zstd'
+
+        return gzip.compress(body, compresslevel=6), 'gzip'
+
+    def request(self, path, datas_json, method):
+        """
+        Realiza la petición a la API y devuelve la respuesta recibida.
         :param path: Directorio dentro de la api (ex: /api/path/endpoint)
         :param datas_json:
-        :return: 
+        :return: Respuesta de requests o None si ha fallado la petición.
         """
 
         url = self.API_URL
@@ -144,11 +222,16 @@ class ApiConnection:
         ## TODO → Añadir metadatos a la subida (info sobre iot que envía)
 
         #data.push(info)
+        body, encoding = self.compress_body(datas_json)
+
+        if encoding:
+            headers['Content-Encoding'] = encoding
+
         try:
-            req = self.requests_retry_session().post(
+            req = self.get_session().post(
                 full_url,
                 #data=json.dumps(datas_json),
-                data=datas_json,
+                data=body,
                 headers=headers,
                 timeout=30
             )
@@ -157,24 +240,85 @@ class ApiConnection:
                 print('Respuesta de API: ', req.status_code)
                 print('Recibido: ', req.text)
 
-            # Guardado correctamente 201, con errores 200, mal 500
-            if int(req.status_code) == 201:
-                return True
-            elif int(req.status_code) == 200:
-                if self.DEBUG:
-                    print('Al guardar en la API algunos elementos tuvieron error.')
-                return True
-            else:
-                return False
+            return req
         except Exception as e:
             if self.DEBUG:
                 print('Ha fallado la petición http :', e.__class__.__name__)
                 print(e)
 
+            # La conexión puede haber quedado rota, se recrea en el próximo uso.
+            self.close_session()
+
             sleep(5)
 
+            return None
+
+    def send(self, path, datas_json, method):
+        """
+        Envía la petición a la API.
+        :param path: Directorio dentro de la api (ex: /api/path/endpoint)
+        :param datas_json:
+        :return: 
+        """
+        req = self.request(path, datas_json, method)
+
+        if req is None:
             return False
 
+        # Guardado correctamente 201, con errores 200, mal 500
+        if int(req.status_code) == 201:
+            return True
+        elif int(req.status_code) == 200:
+            if self.DEBUG:
+                print('Al guardar en la API algunos elementos tuvieron error.')
+            return True
+        else:
+            return False
+
+    def parse_acknowledgements(self, req, count):
+        """
+        Interpreta la respuesta de una subida masiva y devuelve para cada
+        tupla enviada si la API la ha guardado.
+
+        Con 201 se confirman todas. Con 200 se espera un array JSON (o bajo
+        la clave "data" o "results") con un elemento por tupla en el mismo
+        orden: un booleano o un objeto con "success"/"saved". Si no puede
+        interpretarse se mantiene el criterio de send() y se da por buena.
+        :param req: Respuesta de la petición o None.
+        :param count: Cantidad de tuplas enviadas.
+        :return: Lista de booleanos en el orden de envío.
+        """
+        if req is None:
+            return [False] * count
+
+        status = int(req.status_code)
+
+        if status == 201:
+            return [True] * count
+        elif status != 200:
+            return [False] * count
+
+        try:
+            body = req.json()
+        except ValueError:
+            return [True] * count
+
+        if isinstance(body, dict):
+            body = body.get('data', body.get('results'))
+
+        if not isinstance(body, list) or len(body) != count:
+            return [True] * count
+
+        acks = []
+
+        for item in body:
+            if isinstance(item, dict):
+                item = item.get('success', item.get('saved', False))
+
+            acks.append(bool(item))
+
+        return acks
+
     def parse_array_to_json(self, rows, columns):
         """
         Convierte los datos recibidos en JSON
@@ -206,12 +350,12 @@ class ApiConnection:
             indent=4,
         )
 
-    def parse_to_json(self, row, columns):
+    def parse_to_dict(self, row, columns):
         """
-        Convierte los datos recibidos en JSON
-        :param rows: Tuplas con todas las entradas desde la DB.
+        Convierte una tupla en un diccionario serializable a JSON.
+        :param row: Tupla desde la DB.
         :param columns: Nombre de las columnas en orden respecto a tuplas.
-        :return: Devuelve el objeto json
+        :return: Devuelve el diccionario
         """
 
         result = {}
@@ -230,8 +374,18 @@ class ApiConnection:
             if columns[iteracion] != 'id':
                 result.update({ columns[iteracion]: cell })
 
+        return result
+
+    def parse_to_json(self, row, columns):
+        """
+        Convierte los datos recibidos en JSON
+        :param rows: Tuplas con todas las entradas desde la DB.
+        :param columns: Nombre de las columnas en orden respecto a tuplas.
+        :return: Devuelve el objeto json
+        """
+
         return json.dumps(
-            result,
+            self.parse_to_dict(row, columns),
             #default=None,
             #ensure_ascii=False,
             #sort_keys=True,
@@ -247,21 +401,83 @@ class ApiConnection:
         subida atacando la API.
         :param path: Ruta dentro de la api
         :param datas: Datos a enviar
+        :return: Lista con las tuplas que la API ha guardado.
         """
+        acknowledged = []
+
         if datas:
             if self.DEBUG:
                 print('Subiendo dato: ' + name + ', ruta de api: ' + path)
 
-            result_send = False
-
             for data in datas:
                 #print(data)
                 datas_json = self.parse_to_json(data, columns)
                 #print('Datos formateados en JSON:', datas_json)
 
                 if (self.send(path, datas_json, method=method)):
-                    result_send = True
+                    acknowledged.append(data)
+
+        return acknowledged
+
+    def build_batches(self, datas, columns):
+        """
+        Agrupa las tuplas en lotes que no superan API_BATCH_ROWS tuplas ni
+        API_BATCH_BYTES bytes, codificando cada tupla una sola vez.
+        :param datas: Tuplas desde la DB.
+        :param columns: Nombre de las columnas en orden respecto a tuplas.
+        :return: Generador de tuplas (filas del lote, array JSON del lote)
+        """
+        rows = []
+        encoded = []
+        size = 2
+
+        for data in datas:
+            row_json = self.parse_to_json(data, columns)
+            row_size = len(row_json.encode('utf-8')) + 1
+
+            if rows and (len(rows) >= self.API_BATCH_ROWS or
+                         size + row_size > self.API_BATCH_BYTES):
+                yield rows, '[' + ','.join(encoded) + ']'
 
+                rows = []
+                encoded = []
+                size = 2
+
+            rows.append(data)
+            encoded.append(row_json)
+            size += row_size
+
+        if rows:
+            yield rows, '[' + ','.join(encoded) + ']'
+
+    def upload_bulk(self, name, path, datas, columns, method='POST'):
+        """
+        Sube las tuplas como arrays JSON en lotes, una petición por lote.
+        :param name: Nombre del conjunto de datos (para depurar).
+        :param path: Ruta dentro de la api que acepta un array de tuplas.
+        :param datas: Tuplas desde la DB.
+        :param columns: Nombre de las columnas en orden respecto a tuplas.
+        :return: Lista con las tuplas que la API ha confirmado, el resto
+        pueden reintentarse más adelante.
+        """
+        acknowledged = []
+
+        if not datas:
+            return acknowledged
+
+        if self.DEBUG:
+            print('Subiendo lote: ' + name + ', ruta de api: ' + path)
+
+        for rows, batch_json in self.build_batches(datas, columns):
+            req = self.request(path, batch_json, method)
+            acks = self.parse_acknowledgements(req, len(rows))
+
+            acknowledged.extend(
+                row for row, ack in zip(rows, acks) if ack
+            )
 
-            return result_send
+            # Si la API no responde no tiene sentido enviar más lotes.
+            if req is None:
+                break
 
+        return acknowledged
@@ -0,0 +1,281 @@
+#!/usr/bin/python3
+# -*- encoding: utf-8 -*-
+
+# @author     Raúl Caro Pastorino
+# @email      dev@fryntiz.es
+# @web        https://fryntiz.es
+# @gitlab     https://gitlab.com/fryntiz
+# @github     https://github.com/fryntiz
+# @twitter    https://twitter.com/fryntiz
+# @telegram   https://t.me/fryntiz
+
+# Create Date: 2026
+# Project Name:
+# Description:
+#
+# Dependencies:
+#
+# Revision 0.01 - File Created
+# Additional Comments:
+
+# @copyright  Copyright © 2022 Raúl Caro Pastorino
+# @license    https://wwww.gnu.org/licenses/gpl.txt
+
+# Copyright (C) 2022  Raúl Caro Pastorino
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+# Guía de estilos aplicada: PEP8
+
+#######################################
+# #           Descripción           # #
+#######################################
+##
+# # Variante asíncrona (asyncio + aiohttp) de ApiConnection con la misma
+# # interfaz send()/upload()/upload_bulk(), permitiendo varios lotes en vuelo
+# # a la vez con un límite de concurrencia.
+##
+
+#######################################
+# #       Importar Librerías        # #
+#######################################
+
+from Models.ApiConnection import ApiConnection
+import asyncio
+import os
+
+# aiohttp es opcional, solo es necesario para la subida asíncrona.
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+#######################################
+# #             Funciones           # #
+#######################################
+
+
+class AsyncResponse:
+    """
+    Respuesta ya leída con la misma interfaz que usa ApiConnection de las
+    respuestas de requests (status_code, text y json()).
+    """
+
+    def __init__(self, status_code, text, data):
+        self.status_code = status_code
+        self.text = text
+        self.data = data
+
+    def json(self):
+        if self.data is None:
+            raise ValueError('La respuesta no contiene JSON')
+
+        return self.data
+
+
+class AsyncApiConnection(ApiConnection):
+    # Peticiones (lotes) en vuelo a la vez como máximo
+    API_CONCURRENCY = int(os.getenv("API_CONCURRENCY", 4))
+
+    # Reintentos ante errores del servidor, como requests_retry_session()
+    API_RETRIES = 3
+    API_BACKOFF_FACTOR = 0.3
+    API_STATUS_FORCELIST = (500, 502, 504)
+
+    # Bloques "async with" abiertos, la sesión se cierra al salir del último.
+    session_depth = 0
+
+    async def __aenter__(self):
+        self.get_session()
+        self.session_depth += 1
+
+        return self
+
+    async def __aexit__(self, *exc):
+        self.session_depth -= 1
+
+        if self.session_depth == 0:
+            await self.close_session()
+
+    def get_session(self):
+        """
+        Devuelve la sesión aiohttp con su pool de conexiones keep-alive,
+        creándola si aún no existe. Debe llamarse con el bucle en marcha.
+        :return:
+        """
+        if aiohttp is None:
+            raise RuntimeError('Es necesario instalar aiohttp para la '
+                               'subida asíncrona')
+
+        if self.session is None or self.session.closed:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.API_POOL_MAXSIZE),
+                timeout=aiohttp.ClientTimeout(total=30),
+            )
+
+        return self.session
+
+    async def close_session(self):
+        """
+        Cierra la sesión aiohttp y sus conexiones.
+        """
+        if self.session is not None:
+            try:
+                await self.session.close()
+            finally:
+                self.session = None
+
+    async def request(self, path, datas_json, method):
+        """
+        Realiza la petición a la API y devuelve la respuesta recibida.
+        :param path: Directorio dentro de la api (ex: /api/path/endpoint)
+        :param datas_json:
+        :return: AsyncResponse o None si ha fallado la petición.
+        """
+        full_url = self.API_URL + path
+
+        headers = {
+            'Content-type': 'application/json',
+            'Accept': 'application/json',
+            'Authorization': 'Bearer ' + str(self.API_TOKEN),
+        }
+
+        body, encoding = self.compress_body(datas_json)
+
+        if encoding:
+            headers['Content-Encoding'] = encoding
+
+        session = self.get_session()
+
+        for attempt in range(self.API_RETRIES + 1):
+            try:
+                async with session.request(
+                        method, full_url, data=body, headers=headers
+                ) as req:
+                    text = await req.text()
+
+                    if req.status in self.API_STATUS_FORCELIST and \
+                            attempt < self.API_RETRIES:
+                        await asyncio.sleep(
+                            self.API_BACKOFF_FACTOR * (2 ** attempt))
+                        continue
+
+                    if self.DEBUG:
+                        print('Respuesta de API: ', req.status)
+                        print('Recibido: ', text)
+
+                    try:
+                        data = await req.json(content_type=None)
+                    except ValueError:
+                        data = None
+
+                    return AsyncResponse(req.status, text, data)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if self.DEBUG:
+                    print('Ha fallado la petición http :',
+                          e.__class__.__name__)
+                    print(e)
+
+                if attempt < self.API_RETRIES:
+                    await asyncio.sleep(
+                        self.API_BACKOFF_FACTOR * (2 ** attempt))
+
+        return None
+
+    async def send(self, path, datas_json, method):
+        """
+        Envía la petición a la API.
+        :param path: Directorio dentro de la api (ex: /api/path/endpoint)
+        :param datas_json:
+        :return: True si la API la ha guardado.
+        """
+        req = await self.request(path, datas_json, method)
+
+        # Guardado correctamente 201, con errores 200, mal 500
+        return req is not None and int(req.status_code) in (200, 201)
+
+    async def gather_limited(self, jobs, worker):
+        """
+        Ejecuta worker(job) para cada trabajo con como mucho
+        API_CONCURRENCY en vuelo. Los trabajos se generan bajo demanda, así
+        que no se codifican lotes más rápido de lo que se envían.
+        :param jobs: Iterable con los trabajos.
+        :param worker: Corrutina que procesa un trabajo.
+        :return: Resultados en el mismo orden que los trabajos.
+        """
+        semaphore = asyncio.Semaphore(self.API_CONCURRENCY)
+        tasks = []
+
+        async def run(job):
+            try:
+                return await worker(job)
+            finally:
+                semaphore.release()
+
+        for job in jobs:
+            await semaphore.acquire()
+            tasks.append(asyncio.ensure_future(run(job)))
+
+        return await asyncio.gather(*tasks)
+
+    async def upload(self, name, path, datas, columns, method='POST'):
+        """
+        Sube las tuplas de una en una con varias peticiones en vuelo.
+        :param path: Ruta dentro de la api
+        :param datas: Datos a enviar
+        :return: Lista con las tuplas que la API ha guardado, en orden.
+        """
+        if not datas:
+            return []
+
+        if self.DEBUG:
+            print('Subiendo dato: ' + name + ', ruta de api: ' + path)
+
+        async def worker(data):
+            return await self.send(path, self.parse_to_json(data, columns),
+                                   method)
+
+        async with self:
+            acks = await self.gather_limited(datas, worker)
+
+        return [data for data, ack in zip(datas, acks) if ack]
+
+    async def upload_bulk(self, name, path, datas, columns, method='POST'):
+        """
+        Sube las tuplas como arrays JSON en lotes con varios lotes en vuelo.
+        :param name: Nombre del conjunto de datos (para depurar).
+        :param path: Ruta dentro de la api que acepta un array de tuplas.
+        :param datas: Tuplas desde la DB.
+        :param columns: Nombre de las columnas en orden respecto a tuplas.
+        :return: Lista con las tuplas que la API ha confirmado, en el orden
+        de envío.
+        """
+        if not datas:
+            return []
+
+        if self.DEBUG:
+            print('Subiendo lote: ' + name + ', ruta de api: ' + path)
+
+        async def worker(batch):
+            rows, batch_json = batch
+            req = await self.request(path, batch_json, method)
+            acks = self.parse_acknowledgements(req, len(rows))
+
+            return [row for row, ack in zip(rows, acks) if ack]
+
+        async with self:
+            results = await self.gather_limited(
+                self.build_batches(datas, columns), worker)
+
+        return [row for rows in results for row in rows]
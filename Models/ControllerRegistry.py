@@ -0,0 +1,165 @@
+#!/usr/bin/python3
+# -*- encoding: utf-8 -*-
+
+# @author     Raúl Caro Pastorino
+# @email      dev@fryntiz.es
+# @web        https://fryntiz.es
+# @gitlab     https://gitlab.com/fryntiz
+# @github     https://github.com/fryntiz
+# @twitter    https://twitter.com/fryntiz
+# @telegram   https://t.me/fryntiz
+
+# Create Date: 2026
+# Project Name:
+# Description:
+#
+# Dependencies:
+#
+# Revision 0.01 - File Created
+# Additional Comments:
+
+# @copyright  Copyright © 2022 Raúl Caro Pastorino
+# @license    https://wwww.gnu.org/licenses/gpl.txt
+
+# Copyright (C) 2022  Raúl Caro Pastorino
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+# Guía de estilos aplicada: PEP8
+
+#######################################
+# #           Descripción           # #
+#######################################
+## Registro de controladores de carga configurados. Cada puerto serial tiene
+## una única conexión compartida por todos los dispositivos conectados a ese
+## bus (RS-485 encadenado), cada uno con su propio id Modbus.
+##
+## El archivo de configuración (CONTROLLERS_CONFIG) es un JSON con una lista:
+## [{"model": "RenogyRoverLi", "port": "/dev/ttyUSB0", "unit": 1,
+##   "device_id": 1}]
+##
+
+#######################################
+# #       Importar Librerías        # #
+#######################################
+
+from Models.SolarControllers.RenogyRoverLi import RenogyRoverLi
+from Models.SerialConnection import SerialConnection
+import json
+
+#######################################
+# #            FUNCIONES            # #
+#######################################
+
+
+class ControllerRegistry:
+    DEBUG = False
+
+    """
+    Modelos disponibles por nombre para el archivo de configuración.
+    """
+    MODELS = {
+        'RenogyRoverLi': RenogyRoverLi,
+    }
+
+    def __init__ (self, debug=False, persistent=True, poll_budget=None,
+                  record=None):
+        self.DEBUG = debug
+        self.persistent = persistent
+
+        # Archivo donde grabar las lecturas para reproducirlas simuladas
+        self.record = record
+
+        # Segundos máximos por ciclo de lectura de cada controlador
+        self.poll_budget = poll_budget
+
+        # Conexión serial por puerto {puerto: SerialConnection}
+        self.serials = {}
+
+        # Controladores por puerto en orden de lectura {puerto: [modelos]}
+        self.ports = {}
+
+    def add (self, model, port, unit=1, device_id=0):
+        """
+        Instancia un controlador sobre la conexión de su puerto.
+        :param model: Nombre del modelo en MODELS.
+        :param port: Puerto serial (ej: /dev/ttyUSB0) o "sim:" simulado.
+        :param unit: Id Modbus del dispositivo en el bus.
+        :param device_id: Id del dispositivo para la DB y la API.
+        :return: El controlador creado.
+        """
+        if model not in self.MODELS:
+            raise ValueError('Modelo de controlador desconocido: ' + model)
+
+        if port not in self.serials:
+            self.serials[port] = SerialConnection(port=port, debug=self.DEBUG,
+                                                  baudrate=9600, method='rtu',
+                                                  timeout=0.5,
+                                                  persistent=self.persistent,
+                                                  record=self.record)
+
+        controller = self.MODELS[model](device_id=device_id, port=port,
+                                        debug=self.DEBUG, unit=unit,
+                                        serial=self.serials[port])
+
+        if self.poll_budget is not None:
+            controller.poll_budget = self.poll_budget
+
+        self.ports.setdefault(port, []).append(controller)
+
+        if self.DEBUG:
+            print('Controlador registrado:', model, port, unit, device_id)
+
+        return controller
+
+    def load_file (self, path):
+        """
+        Registra los controladores descritos en un archivo JSON.
+        :param path: Ruta al archivo de configuración.
+        """
+        with open(path) as file:
+            config = json.load(file)
+
+        for entry in config:
+            self.add(entry.get('model', 'RenogyRoverLi'), entry['port'],
+                     unit=int(entry.get('unit', 1)),
+                     device_id=int(entry.get('device_id', 0)))
+
+    def controllers (self):
+        """
+        Devuelve todos los controladores registrados.
+        :return:
+        """
+        return [controller for controllers in self.ports.values()
+                for controller in controllers]
+
+    def tables (self):
+        """
+        Devuelve un controlador de cada tabla para crear y subir las tablas
+        una sola vez aunque haya varios dispositivos del mismo modelo.
+        :return: Diccionario {nombre de tabla: controlador}
+        """
+        tables = {}
+
+        for controller in self.controllers():
+            tables.setdefault(controller.tablename, controller)
+
+        return tables
+
+    def close (self):
+        """
+        Cierra las conexiones seriales de todos los puertos.
+        """
+        for serial in self.serials.values():
+            serial.close()
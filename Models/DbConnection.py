@@ -51,7 +51,8 @@
 
 import datetime
 from sqlalchemy import create_engine, Table, Column, Integer, String, \
-    MetaData, DateTime, Numeric, select, text, Boolean
+    MetaData, DateTime, Numeric, select, text, Boolean, inspect, BigInteger, \
+    event, exc
 
 from sqlalchemy.orm import sessionmaker
 
@@ -60,6 +61,86 @@ from dotenv import load_dotenv
 
 load_dotenv(override=True)
 import os
+import time
+import functools
+import hashlib
+import json
+import threading
+
+# Versión de los pasos de migración de table_set_new(). Forma parte de la
+# huella, al añadir un paso se incrementa para que se aplique una vez en
+# las tablas existentes aunque su tablemodel() no haya cambiado.
+# 2 → table_widen_columns() (contadores históricos a BIGINT).
+SCHEMA_MIGRATIONS = 2
+
+
+def synchronized (method):
+    """
+    Serializa el acceso a la conexión compartida cuando se usa desde varios
+    hilos (guardado y subida).
+    :param method:
+    :return:
+    """
+    @functools.wraps(method)
+    def wrapper (self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def schema_fingerprint (parameters):
+    """
+    Calcula la huella del esquema de una tabla a partir de su tablemodel()
+    y de SCHEMA_MIGRATIONS, cambia al añadir, quitar o modificar cualquier
+    columna o al añadir un paso de migración.
+    :param parameters: Parámetros para cada columna.
+    :return: Huella sha256 en hexadecimal.
+    """
+    def describe (value):
+        # Los valores por defecto calculados se identifican por su nombre.
+        return getattr(value, '__qualname__', None) or repr(value)
+
+    schema = json.dumps([SCHEMA_MIGRATIONS, parameters], sort_keys=True,
+                        default=describe)
+
+    return hashlib.sha256(schema.encode('utf-8')).hexdigest()
+
+
+def create_sqlite_engine (path, synchronous='NORMAL',
+                          journal_size_limit=4194304):
+    """
+    Crea el motor para una base de datos SQLite local en modo WAL, que no
+    necesita servidor y permite leer la cola mientras se inserta.
+    :param path: Ruta al archivo de la base de datos.
+    :param synchronous: Nivel de PRAGMA synchronous. Con WAL, NORMAL solo
+    puede perder las últimas transacciones ante un corte de luz, nunca
+    corromper la base de datos.
+    :param journal_size_limit: Bytes a los que se recorta el archivo -wal
+    tras cada checkpoint para no llenar la tarjeta SD.
+    :return:
+    """
+    if synchronous.upper() not in ('OFF', 'NORMAL', 'FULL', 'EXTRA'):
+        raise ValueError('DB_SQLITE_SYNCHRONOUS no válido: ' + synchronous)
+
+    directory = os.path.dirname(path)
+
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    engine = create_engine('sqlite:///' + path,
+                           connect_args={'check_same_thread': False})
+
+    @event.listens_for(engine, 'connect')
+    def set_sqlite_pragmas (dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=' + synchronous)
+        cursor.execute('PRAGMA journal_size_limit=' +
+                       str(int(journal_size_limit)))
+        cursor.close()
+
+    return engine
 
 
 class DbConnection:
@@ -73,21 +154,97 @@ class DbConnection:
     DB_USERNAME = os.getenv("DB_USERNAME")
     DB_PASSWORD = os.getenv("DB_PASSWORD")
 
-    # Conexión a la base de datos
-    engine = create_engine(DB_CONNECTION + '://' + DB_USERNAME +
-                           ':' + DB_PASSWORD + '@' + DB_HOST + ':' + DB_PORT
-                           + '/' + DB_DATABASE)
-    meta = MetaData()
-    connection = engine.connect()
+    # Ajustes de SQLite (DB_CONNECTION=sqlite)
+    DB_SQLITE_SYNCHRONOUS = os.getenv("DB_SQLITE_SYNCHRONOUS", "NORMAL")
+    DB_SQLITE_JOURNAL_SIZE_LIMIT = int(os.getenv(
+        "DB_SQLITE_JOURNAL_SIZE_LIMIT", 4194304))
 
-    # Sesión para acciones por lotes
-    Session = sessionmaker(bind=engine)
+    # Motor, conexión y sesiones se crean al primer uso para que arrancar
+    # no dependa de que la base de datos esté disponible.
+    engine = None
+    connection = None
+    Session = None
+    meta = MetaData()
 
     tables = { }
 
+    # Columnas (sin id) y valores por defecto calculados de cada tabla para
+    # preparar las tuplas sin recorrer las columnas en cada guardado.
+    insert_columns = { }
+    insert_defaults = { }
+
+    # Tabla con la huella del esquema de cada tabla de datos, si no cambia
+    # se evita crear tablas y consultar su estructura en cada arranque.
+    SCHEMA_TABLENAME = 'schema_fingerprints'
+    schema_table = None
+
+    # Bloqueo para el acceso concurrente a la conexión
+    lock = threading.RLock()
+
+    # Tuplas pendientes de insertar por tabla y momento de la primera.
+    buffers = { }
+    buffers_started = { }
+
+    # Se vuelca el buffer al llegar a estas tuplas o segundos (0 → sin límite)
+    DB_BUFFER_ROWS = int(os.getenv("DB_BUFFER_ROWS", 1))
+    DB_BUFFER_SECONDS = float(os.getenv("DB_BUFFER_SECONDS", 0))
+
+    # Tuplas que se conservan en memoria mientras la DB falla, al superarse
+    # se descartan las más antiguas
+    DB_BUFFER_MAX_ROWS = int(os.getenv("DB_BUFFER_MAX_ROWS", 10000))
+
+    @synchronized
+    def get_engine (self):
+        """
+        Devuelve el motor de la base de datos, creándolo la primera vez.
+        Con sqlite DB_DATABASE es la ruta al archivo y no hace falta servidor.
+        :return:
+        """
+        if self.engine is None:
+            if self.DB_CONNECTION == 'sqlite':
+                self.engine = create_sqlite_engine(
+                    self.DB_DATABASE, self.DB_SQLITE_SYNCHRONOUS,
+                    self.DB_SQLITE_JOURNAL_SIZE_LIMIT)
+            else:
+                self.engine = create_engine(
+                    self.DB_CONNECTION + '://' + self.DB_USERNAME + ':' +
+                    self.DB_PASSWORD + '@' + self.DB_HOST + ':' +
+                    self.DB_PORT + '/' + self.DB_DATABASE)
+
+            # Sesión para acciones por lotes
+            self.Session = sessionmaker(bind=self.engine)
+
+        return self.engine
+
+    @synchronized
+    def get_connection (self):
+        """
+        Devuelve la conexión con la base de datos, abriéndola en el primer
+        uso o si se cerró.
+        :return:
+        """
+        if self.connection is None or self.connection.closed:
+            if self.has_debug:
+                print('Conectando con la base de datos')
+
+            self.connection = self.get_engine().connect()
+
+        return self.connection
+
+    def get_session (self):
+        """
+        Devuelve una sesión nueva para acciones por lotes.
+        :return:
+        """
+        self.get_engine()
+
+        return self.Session()
+
+    @synchronized
     def table_set_new (self, tablename, parameters):
         """
         Almacena una nueva tabla en el array de tablas.
+        Cada columna puede declarar 'index': True para crear su índice.
         :param tablename: Nombre de la tabla.
         :param parameters: Parámetros para cada columna.
         """
@@ -111,17 +268,26 @@ class DbConnection:
                 type_column = DateTime
             elif data_type == 'Integer':
                 type_column = Integer
+            elif data_type == 'BigInteger':
+                type_column = BigInteger
             elif data_type == 'String':
                 type_column = String(**data_params)
             elif data_type == 'Boolean':
                 type_column = Boolean
 
-            if datas['others']:
-                columns.append(Column(name, type_column, **other_data))
-            else:
-                columns.append(Column(name, type_column))
+            column_params = dict(other_data) if other_data else {}
+
+            if datas.get('index'):
+                column_params['index'] = True
 
-        print(tablename, parameters)
+            columns.append(Column(name, type_column, **column_params))
+
+        if self.has_debug:
+            print(tablename, parameters)
+
+        # Al reintentar o reiniciar loop() la tabla ya existe en meta.
+        if tablename in self.meta.tables:
+            self.meta.remove(self.meta.tables[tablename])
 
         # Creo la tabla con las columnas antes seteadas.
         self.tables[tablename] = Table(
@@ -130,10 +296,182 @@ class DbConnection:
             *columns,
         )
 
-        self.meta.create_all(self.engine)
+        table = self.tables[tablename]
+
+        self.insert_columns[tablename] = tuple(
+            column.name for column in table.columns if column.name != 'id')
+        self.insert_defaults[tablename] = [
+            (column.name, column.default.arg) for column in table.columns
+            if column.default is not None and column.default.is_callable
+        ]
+
+        fingerprint = schema_fingerprint(parameters)
+
+        if self.table_get_fingerprint(tablename) == fingerprint:
+            if self.has_debug:
+                print('Esquema sin cambios para la tabla:', tablename)
+
+            return
+
+        self.tables[tablename].create(self.get_engine(), checkfirst=True)
+
+        # create() no añade columnas ni índices nuevos a tablas existentes.
+        self.table_add_columns(tablename)
+        self.table_widen_columns(tablename)
+        self.table_create_indexes(tablename)
+
+        self.table_set_fingerprint(tablename, fingerprint)
+
+        print('Tablas en la DB: ', self.get_engine().table_names())
+
+    def get_schema_table (self):
+        """
+        Devuelve la tabla de huellas de esquema (sin consultar la DB).
+        :return:
+        """
+        # meta es común a todas las instancias, la tabla puede existir ya.
+        if self.schema_table is None:
+            self.schema_table = self.meta.tables.get(self.SCHEMA_TABLENAME)
+
+        if self.schema_table is None:
+            self.schema_table = Table(
+                self.SCHEMA_TABLENAME,
+                self.meta,
+                Column('tablename', String(255), primary_key=True),
+                Column('fingerprint', String(64)),
+                Column('updated_at', DateTime,
+                       default=datetime.datetime.utcnow),
+            )
+
+        return self.schema_table
+
+    def table_get_fingerprint (self, tablename):
+        """
+        Devuelve la huella guardada del esquema de una tabla, creando la
+        tabla de huellas si aún no existe.
+        :param tablename: Nombre de la tabla.
+        :return: Huella o None si no hay ninguna guardada.
+        """
+        schema = self.get_schema_table()
+
+        try:
+            row = self.get_connection().execute(
+                select([schema.c.fingerprint])
+                .where(schema.c.tablename == tablename)
+            ).first()
+        except (exc.ProgrammingError, exc.OperationalError):
+            schema.create(self.get_engine(), checkfirst=True)
+
+            return None
+
+        return row.fingerprint if row else None
+
+    def table_set_fingerprint (self, tablename, fingerprint):
+        """
+        Guarda la huella del esquema de una tabla.
+        :param tablename: Nombre de la tabla.
+        :param fingerprint: Huella calculada con schema_fingerprint().
+        """
+        schema = self.get_schema_table()
+        connection = self.get_connection()
+
+        with connection.begin():
+            connection.execute(
+                schema.delete().where(schema.c.tablename == tablename))
+            connection.execute(schema.insert(), {
+                'tablename': tablename,
+                'fingerprint': fingerprint,
+            })
+
+    def table_add_columns (self, tablename):
+        """
+        Añade a la tabla de la DB las columnas nuevas del modelo. Solo se
+        añaden columnas, las eliminadas o con otro tipo se dejan como están
+        (salvo los enteros a ensanchar de table_widen_columns()).
+        :param tablename: Nombre de la tabla.
+        """
+        table = self.tables[tablename]
+        engine = self.get_engine()
+        quote = engine.dialect.identifier_preparer.quote
+
+        existing = [column['name'] for column in
+                    inspect(engine).get_columns(tablename)]
+
+        for column in table.columns:
+            if column.name in existing:
+                continue
+
+            print('Añadiendo columna: ', tablename, column.name)
+
+            self.get_connection().execute(text(
+                'ALTER TABLE {} ADD COLUMN {} {}'.format(
+                    quote(tablename), quote(column.name),
+                    column.type.compile(dialect=engine.dialect))
+            ))
+
+    def table_widen_columns (self, tablename):
+        """
+        Cambia a BIGINT las columnas que el modelo declara BigInteger y en la
+        DB aún son enteros más pequeños, como los contadores históricos de
+        instalaciones anteriores. En SQLite INTEGER ya es de 64 bits.
+        :param tablename: Nombre de la tabla.
+        """
+        table = self.tables[tablename]
+        engine = self.get_engine()
+        dialect = engine.dialect
+        quote = dialect.identifier_preparer.quote
+
+        if dialect.name == 'sqlite':
+            return
+
+        existing = {column['name']: column['type'] for column in
+                    inspect(engine).get_columns(tablename)}
+
+        for column in table.columns:
+            current = existing.get(column.name)
+
+            if not isinstance(column.type, BigInteger) or current is None or \
+                    not isinstance(current, Integer) or \
+                    isinstance(current, BigInteger):
+                continue
 
-        print('Tablas en la DB: ', self.engine.table_names())
+            print('Ensanchando columna a BIGINT: ', tablename, column.name)
 
+            if dialect.name == 'postgresql':
+                sql = 'ALTER TABLE {} ALTER COLUMN {} TYPE BIGINT'
+            else:
+                sql = 'ALTER TABLE {} MODIFY COLUMN {} BIGINT' + \
+                      ('' if column.nullable else ' NOT NULL')
+
+            self.get_connection().execute(text(
+                sql.format(quote(tablename), quote(column.name))))
+
+    def table_create_indexes (self, tablename):
+        """
+        Crea en la DB los índices declarados para la tabla que aún no existan.
+        :param tablename: Nombre de la tabla.
+        """
+        table = self.tables[tablename]
+
+        existing = [index['name'] for index in
+                    inspect(self.get_engine()).get_indexes(tablename)]
+
+        for index in table.indexes:
+            if index.name not in existing:
+                if self.has_debug:
+                    print('Creando índice: ', index.name)
+
+                index.create(self.get_engine())
+
+    def table_get_columns (self, tablename):
+        """
+        Devuelve el nombre de las columnas en el orden de las tuplas.
+        :param tablename: Nombre de la tabla.
+        :return:
+        """
+        return self.tables[tablename].columns.keys()
+
+    @synchronized
     def table_get_data (self, tablename):
         """
         Obtiene los datos de una tabla previamente seteada.
@@ -143,10 +481,11 @@ class DbConnection:
         table = self.tables[tablename]
 
         # Ejecuto la consulta para traer las tuplas de la tabla completa
-        return self.connection.execute(
+        return self.get_connection().execute(
             select([table])
         ).fetchall()
 
+    @synchronized
     def table_get_data_last (self, tablename, limit):
         """
         Obtiene los datos de una tabla previamente seteada limitando resultados.
@@ -159,41 +498,177 @@ class DbConnection:
         if self.has_debug:
             print('----------- table_get_data_last ------------')
 
-        # Ejecuto la consulta para traer las tuplas de la tabla limitada
-        return self.connection.execute(
-            select([table]).order_by(text('created_at DESC')).limit(limit)
+        # Ejecuto la consulta para traer las tuplas de la tabla limitada, el
+        # id es autoincremental así que sigue el orden de inserción.
+        return self.get_connection().execute(
+            select([table]).order_by(table.c.id.desc()).limit(limit)
         ).fetchall()
 
+    @synchronized
+    def table_get_queue (self, tablename, limit, after_id=0):
+        """
+        Obtiene las tuplas pendientes de subir de la más antigua a la más
+        reciente, a partir de un id (cursor) para recorrer la cola sin
+        volver a leer lo ya procesado.
+        :param tablename: Nombre de la tabla desde la que obtener datos.
+        :param limit: Límite de datos a extraer de la db
+        :param after_id: Solo tuplas con id mayor a este.
+        """
+
+        table = self.tables[tablename]
+
+        return self.get_connection().execute(
+            select([table])
+            .where(table.c.id > after_id)
+            .order_by(table.c.id.asc())
+            .limit(limit)
+        ).fetchall()
+
+    @synchronized
     def table_save_data (self, tablename, params):
         """
-        Almacena datos recibidos en la tabla recibida.
+        Almacena datos recibidos en la tabla recibida. Las tuplas se
+        acumulan en memoria y se insertan juntas al alcanzar DB_BUFFER_ROWS
+        tuplas o DB_BUFFER_SECONDS segundos.
         :param tablename: Nombre de la tabla en la que guardar.
-        :param params: Diccionario con los datos a guardar.
+        :param params: Diccionario con los datos a guardar o tupla con las
+        columnas en su orden (sin id) como la de build_row() del modelo.
         """
 
         table = self.tables[tablename]
 
+        # Tupla de build_row() en el orden de las columnas de la tabla.
+        if isinstance(params, tuple):
+            columns = self.insert_columns[tablename]
+
+            if len(params) != len(columns):
+                raise ValueError('La tupla no coincide con las columnas de ' +
+                                 tablename)
+
+            row = dict(zip(columns, params))
+        else:
+            row = dict(params)
+
+        # Los valores por defecto calculados (created_at) se fijan ahora y
+        # no en el momento de volcar el buffer.
+        for name, default in self.insert_defaults[tablename]:
+            if row.get(name) is None:
+                row[name] = default(None)
+
         print("\n")
-        print('Guardando en DB: ', table, params)
+        print('Guardando en DB: ', table, row)
 
-        # Inserto Datos
-        try:
-            stmt = table.insert().values(params).return_defaults()
-            result = self.connection.execute(stmt)
-            # server_created_at = result.returned_defaults['created_at']
-        except Exception as e:
-            print('Ha ocurrido un problema al insertar datos',
-                  e.__class__.__name__)
-            print(e)
+        buffer = self.buffers.setdefault(tablename, [])
+
+        if not buffer:
+            self.buffers_started[tablename] = time.monotonic()
+
+        buffer.append(row)
+
+        elapsed = time.monotonic() - self.buffers_started[tablename]
+
+        if len(buffer) >= self.DB_BUFFER_ROWS or \
+                (self.DB_BUFFER_SECONDS and elapsed >= self.DB_BUFFER_SECONDS):
+            return self.table_flush(tablename)
+
+    @synchronized
+    def table_flush (self, tablename=None):
+        """
+        Inserta las tuplas acumuladas en una única transacción (executemany).
+        Si la inserción falla las tuplas vuelven al principio del buffer y se
+        reintentan en el siguiente guardado o volcado.
+        :param tablename: Tabla a volcar, por defecto todas.
+        :return: Cantidad de tuplas insertadas.
+        """
+        tablenames = [tablename] if tablename else list(self.buffers.keys())
+        inserted = 0
+
+        for name in tablenames:
+            rows = self.buffers.get(name)
+
+            if not rows:
+                continue
+
+            self.buffers[name] = []
+            table = self.tables[name]
+
+            trans = None
+
+            # Inserto Datos
+            try:
+                connection = self.get_connection()
+                trans = connection.begin()
+                connection.execute(table.insert(), rows)
+                trans.commit()
+
+                inserted += len(rows)
+            except Exception as e:
+                print('Ha ocurrido un problema al insertar datos',
+                      e.__class__.__name__)
+                print(e)
+
+                if trans is not None:
+                    try:
+                        trans.rollback()
+                    except Exception:
+                        pass
+
+                # Devuelvo las tuplas delante de las que hayan llegado.
+                buffer = rows + self.buffers[name]
+                discarded = len(buffer) - self.DB_BUFFER_MAX_ROWS
+
+                if discarded > 0:
+                    print('Buffer de la DB lleno, tuplas descartadas:',
+                          discarded)
+                    buffer = buffer[discarded:]
+
+                self.buffers[name] = buffer
+
+        return inserted
+
+    @synchronized
+    def table_flush_due (self):
+        """
+        Vuelca los buffers cuya tupla más antigua supera DB_BUFFER_SECONDS,
+        para que se guarden a tiempo aunque no lleguen tuplas nuevas.
+        :return: Segundos hasta el próximo volcado o None si no hay ninguno
+        pendiente.
+        """
+        if not self.DB_BUFFER_SECONDS:
             return None
 
+        now = time.monotonic()
+        wait = None
+
+        for name, rows in list(self.buffers.items()):
+            if not rows:
+                continue
+
+            remaining = self.buffers_started[name] + \
+                self.DB_BUFFER_SECONDS - now
+
+            if remaining <= 0:
+                self.table_flush(name)
+
+                if not self.buffers[name]:
+                    continue
+
+                # Si ha fallado se reintenta pasado otro intervalo.
+                remaining = self.DB_BUFFER_SECONDS
+
+            wait = remaining if wait is None else min(wait, remaining)
+
+        return wait
+
+    @synchronized
     def table_truncate (self, tablename):
         """
         Vacia completamente la tabla recibida.
         :param tablename: Nombre de la tabla.
         """
-        self.connection.execute(self.tables[tablename].delete())
+        self.get_connection().execute(self.tables[tablename].delete())
 
+    @synchronized
     def table_drop_last_elements (self, tablename, limit):
         """
         Elimina los últimos elementos en la cantidad recibida, de una
@@ -203,7 +678,7 @@ class DbConnection:
         :return:
         """
         table = self.tables.get(tablename)
-        session = self.Session()
+        session = self.get_session()
 
         ## Obtengo los últimos elementos para eliminarlos posteriormente.
         lastData = self.table_get_data_last(tablename, limit)
@@ -218,6 +693,24 @@ class DbConnection:
         session.execute(query)
         session.commit()
 
+    @synchronized
+    def table_drop_ids (self, tablename, ids):
+        """
+        Elimina de la tabla recibida las tuplas con los ids indicados.
+        :param tablename: Nombre de la tabla sobre la que actuar
+        :param ids: Lista de ids a eliminar
+        :return:
+        """
+        if not ids:
+            return
+
+        table = self.tables.get(tablename)
+        session = self.get_session()
+
+        query = table.delete().where(table.c.id.in_(ids))
+        session.execute(query)
+        session.commit()
+
     def get_all_data (self):
         '''
         Obtiene todos los datos de la base de datos para todos los
@@ -231,12 +724,13 @@ class DbConnection:
         """
         pass
 
+    @synchronized
     def truncate_db (self):
         """
         Limpia la Base de datos completamente para comenzar a recopilar
         información desde una base de datos saneada/limpia.
         """
-        con = self.connection
+        con = self.get_connection()
         trans = con.begin()
         con.execute('SET FOREIGN_KEY_CHECKS = 0;')
         for table in self.meta.sorted_tables:
@@ -244,7 +738,15 @@ class DbConnection:
         con.execute('SET FOREIGN_KEY_CHECKS = 1;')
         trans.commit()
 
+    @synchronized
     def close_connection (self):
+        # Vuelco lo pendiente antes de cerrar para no perder lecturas.
+        self.table_flush()
+
+        # Si nunca se llegó a usar no hay nada que cerrar.
+        if self.connection is None:
+            return
+
         print('Cerrando conexión con la Base de Datos')
         self.connection.close()
 
@@ -0,0 +1,258 @@
+#!/usr/bin/python3
+# -*- encoding: utf-8 -*-
+
+# @author     Raúl Caro Pastorino
+# @email      dev@fryntiz.es
+# @web        https://fryntiz.es
+# @gitlab     https://gitlab.com/fryntiz
+# @github     https://github.com/fryntiz
+# @twitter    https://twitter.com/fryntiz
+# @telegram   https://t.me/fryntiz
+
+# Create Date: 2026
+# Project Name:
+# Description:
+#
+# Dependencies:
+#
+# Revision 0.01 - File Created
+# Additional Comments:
+
+# @copyright  Copyright © 2022 Raúl Caro Pastorino
+# @license    https://wwww.gnu.org/licenses/gpl.txt
+
+# Copyright (C) 2022  Raúl Caro Pastorino
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+# Guía de estilos aplicada: PEP8
+
+#######################################
+# #           Descripción           # #
+#######################################
+## Separa la adquisición, el guardado en base de datos y la subida a la API
+## en etapas independientes comunicadas por colas acotadas, de forma que la
+## latencia de la red nunca retrase la siguiente lectura.
+##
+## adquisición → (cola acotada) → hilo de guardado → (aviso) → hilo de subida
+##
+
+#######################################
+# #       Importar Librerías        # #
+#######################################
+
+import queue
+import threading
+
+#######################################
+# #            FUNCIONES            # #
+#######################################
+
+
+class Pipeline:
+    DEBUG = False
+
+    # Marca para detener el hilo de guardado tras vaciar la cola.
+    STOP = object()
+
+    def __init__ (self, dbconnection, upload=None, queue_size=100,
+                  upload_interval=60, debug=False, setup=None,
+                  setup_retry=30):
+        """
+        :param dbconnection: Conexión con la base de datos (DbConnection).
+        :param upload: Función sin parámetros que sube los datos pendientes
+        de la DB a la API, None para no subir.
+        :param setup: Función sin parámetros que prepara la DB (crear
+        tablas) desde el hilo de guardado, así las lecturas comienzan
+        aunque la DB aún no esté disponible.
+        :param setup_retry: Segundos entre intentos de setup fallidos.
+        :param queue_size: Lecturas máximas esperando a ser guardadas.
+        :param upload_interval: Segundos máximos entre subidas aunque no
+        lleguen lecturas nuevas.
+        :param debug:
+        """
+        self.dbconnection = dbconnection
+        self.upload = upload
+        self.setup = setup
+        self.setup_retry = setup_retry
+        self.upload_interval = upload_interval
+        self.DEBUG = debug
+
+        self.storage_queue = queue.Queue(maxsize=queue_size)
+        self.upload_event = threading.Event()
+        self.stopping = threading.Event()
+
+        # Se activa cuando setup ha terminado y la DB puede usarse.
+        self.ready = threading.Event()
+
+        self.threads = []
+
+        # Lecturas descartadas por tener la cola de guardado llena.
+        self.dropped = 0
+
+    def start (self):
+        """
+        Arranca los hilos de guardado y subida.
+        """
+        self.stopping.clear()
+
+        self.threads = [
+            threading.Thread(target=self.storage_worker, name='storage',
+                             daemon=True),
+        ]
+
+        if self.upload:
+            self.threads.append(
+                threading.Thread(target=self.upload_worker, name='upload',
+                                 daemon=True)
+            )
+
+        for thread in self.threads:
+            thread.start()
+
+    def stop (self, timeout=60):
+        """
+        Guarda las lecturas pendientes y detiene los hilos.
+        :param timeout: Segundos máximos a esperar por cada hilo.
+        """
+        self.stopping.set()
+        self.upload_event.set()
+
+        # Si el hilo de guardado ya terminó nadie vacía la cola llena.
+        try:
+            self.storage_queue.put(self.STOP, timeout=timeout)
+        except queue.Full:
+            pass
+
+        for thread in self.threads:
+            thread.join(timeout)
+
+        self.threads = []
+
+    def submit (self, tablename, params):
+        """
+        Entrega una lectura a la etapa de guardado sin bloquear nunca la
+        adquisición. Si la cola está llena se descarta la lectura más
+        antigua para conservar las recientes.
+        :param tablename: Tabla en la que guardar la lectura.
+        :param params: Tupla de build_row() o diccionario con los datos.
+        """
+        item = (tablename, params)
+
+        while True:
+            try:
+                self.storage_queue.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    self.storage_queue.get_nowait()
+                    self.storage_queue.task_done()
+                    self.dropped += 1
+
+                    print('Cola de guardado llena, lectura descartada')
+                except queue.Empty:
+                    pass
+
+    def storage_worker (self):
+        """
+        Guarda en la DB las lecturas recibidas y avisa a la subida. Entre
+        lecturas vuelca los buffers que superan su tiempo máximo.
+        """
+        if not self.run_setup():
+            return
+
+        while True:
+            # Sin lecturas nuevas espero solo hasta el próximo volcado por
+            # tiempo del buffer (DB_BUFFER_SECONDS o SPOOL_SYNC_SECONDS).
+            timeout = self.dbconnection.table_flush_due()
+
+            try:
+                item = self.storage_queue.get(timeout=timeout)
+            except queue.Empty:
+                self.dbconnection.table_flush_due()
+                self.upload_event.set()
+                continue
+
+            try:
+                if item is self.STOP:
+                    self.dbconnection.table_flush()
+                    return
+
+                tablename, params = item
+
+                self.dbconnection.table_save_data(tablename=tablename,
+                                                  params=params)
+
+                self.upload_event.set()
+            except Exception as e:
+                print('Error al guardar en la DB:', e.__class__.__name__)
+                print(e)
+            finally:
+                self.storage_queue.task_done()
+
+    def run_setup (self):
+        """
+        Ejecuta setup hasta que tenga éxito, mientras tanto las lecturas
+        esperan en la cola de guardado.
+        :return: False si se ha detenido antes de completarse.
+        """
+        done = self.setup is None
+
+        while not done and not self.stopping.is_set():
+            try:
+                self.setup()
+                done = True
+            except Exception as e:
+                print('DB no disponible, reintentando en',
+                      self.setup_retry, 's:', e.__class__.__name__)
+
+                if self.DEBUG:
+                    print(e)
+
+                self.stopping.wait(self.setup_retry)
+
+        if not done:
+            print('Lecturas sin guardar al detener:',
+                  self.storage_queue.qsize())
+
+            return False
+
+        self.ready.set()
+
+        return True
+
+    def upload_worker (self):
+        """
+        Sube los datos pendientes cada vez que se guardan lecturas nuevas o
+        como mucho cada upload_interval segundos.
+        """
+        # No se sube nada hasta que la DB esté preparada.
+        while not self.ready.wait(1):
+            if self.stopping.is_set():
+                return
+
+        while not self.stopping.is_set():
+            self.upload_event.wait(self.upload_interval)
+            self.upload_event.clear()
+
+            if self.stopping.is_set():
+                return
+
+            try:
+                self.upload()
+            except Exception as e:
+                if self.DEBUG:
+                    print('Error al subir datos a la api:',
+                          e.__class__.__name__)
+                    print(e)
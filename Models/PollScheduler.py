@@ -0,0 +1,160 @@
+#!/usr/bin/python3
+# -*- encoding: utf-8 -*-
+
+# @author     Raúl Caro Pastorino
+# @email      dev@fryntiz.es
+# @web        https://fryntiz.es
+# @gitlab     https://gitlab.com/fryntiz
+# @github     https://github.com/fryntiz
+# @twitter    https://twitter.com/fryntiz
+# @telegram   https://t.me/fryntiz
+
+# Create Date: 2026
+# Project Name:
+# Description:
+#
+# Dependencies:
+#
+# Revision 0.01 - File Created
+# Additional Comments:
+
+# @copyright  Copyright © 2022 Raúl Caro Pastorino
+# @license    https://wwww.gnu.org/licenses/gpl.txt
+
+# Copyright (C) 2022  Raúl Caro Pastorino
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+# Guía de estilos aplicada: PEP8
+
+#######################################
+# #           Descripción           # #
+#######################################
+## Planificador de lecturas sin deriva: dispara en marcas fijas alineadas
+## con el reloj (cada minuto en punto con un periodo de 60s) usando el reloj
+## monotónico para esperar, e informa de los ciclos que se han pasado de
+## tiempo saltando las marcas perdidas en lugar de acumularlas.
+##
+
+#######################################
+# #       Importar Librerías        # #
+#######################################
+
+import time
+
+#######################################
+# #            FUNCIONES            # #
+#######################################
+
+
+class PollScheduler:
+    DEBUG = False
+
+    # Diferencia máxima (s) entre reloj de pared y monotónico antes de
+    # realinear, por ejemplo al sincronizar NTP tras arrancar sin RTC.
+    RESYNC_THRESHOLD = 1.0
+
+    def __init__ (self, period=60, align=True, debug=False, immediate=False):
+        """
+        :param period: Segundos entre cada marca.
+        :param align: Alinea las marcas a múltiplos del periodo en el reloj
+        de pared (epoch), si no se cuentan desde el primer ciclo.
+        :param debug:
+        :param immediate: La primera marca es el momento actual, sin esperar
+        a la primera marca alineada.
+        """
+        self.period = float(period)
+        self.align = align
+        self.DEBUG = debug
+        self.immediate = immediate
+
+        # Próxima marca según time.monotonic() y su equivalente en epoch.
+        self.next_tick = None
+        self.next_tick_wall = None
+
+        # Diferencia entre reloj de pared y monotónico al alinear.
+        self.clock_offset = None
+
+        # Ciclos que se han pasado de tiempo y marcas saltadas en total.
+        self.overruns = 0
+        self.skipped = 0
+
+    def start (self):
+        """
+        Calcula la primera marca a partir del momento actual.
+        """
+        now_wall = time.time()
+        now = time.monotonic()
+
+        wait = (-now_wall) % self.period if self.align else 0
+
+        self.clock_offset = now_wall - now
+        self.next_tick = now + wait
+        self.next_tick_wall = now_wall + wait
+
+    def wait (self):
+        """
+        Espera hasta la próxima marca. Si el ciclo anterior se ha pasado de
+        tiempo salta las marcas perdidas y espera a la siguiente.
+        :return: Momento (epoch) de la marca, para usarlo como marca de
+        tiempo de la lectura.
+        """
+        # Tras start() la marca nunca cuenta como retrasada, sin alinear es
+        # el momento actual y ya ha pasado al volver a leer el reloj.
+        started = False
+
+        if self.next_tick is None:
+            self.start()
+            started = True
+
+            # Lectura sin alinear al arrancar, las siguientes ya alineadas.
+            if self.immediate and self.align:
+                now = time.monotonic()
+
+                # Justo en una marca alineada se lee una sola vez.
+                if self.next_tick <= now:
+                    self.next_tick += self.period
+                    self.next_tick_wall += self.period
+
+                return self.clock_offset + now
+        elif abs(time.time() - time.monotonic() - self.clock_offset) > \
+                self.RESYNC_THRESHOLD:
+            if self.DEBUG:
+                print('Reloj del sistema ajustado, realineando marcas')
+
+            self.start()
+            started = True
+
+        now = time.monotonic()
+
+        if now > self.next_tick and not started:
+            late = now - self.next_tick
+            missed = int(late // self.period) + 1
+
+            self.overruns += 1
+            self.skipped += missed
+            self.next_tick += missed * self.period
+            self.next_tick_wall += missed * self.period
+
+            print('Lectura fuera de tiempo por {:.1f}s, marcas saltadas: {}'
+                  .format(late, missed))
+
+        time.sleep(max(0.0, self.next_tick - time.monotonic()))
+
+        tick = self.next_tick_wall
+
+        self.next_tick += self.period
+        self.next_tick_wall += self.period
+
+        return tick
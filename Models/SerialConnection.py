@@ -50,6 +50,11 @@
 #from pymodbus.client import ModbusSerialClient as ModbusClient ## pymodbus 3.1
 from pymodbus.client.sync import ModbusSerialClient as ModbusClient ## pymodbus 2.1.0
 from pymodbus.constants import Defaults
+from pymodbus.exceptions import ConnectionException, ModbusIOException
+from contextlib import contextmanager
+import random
+import threading
+import time
 
 Defaults.RetryOnEmpty = True
 Defaults.Timeout = 3
@@ -61,20 +66,89 @@ Defaults.Retries = 5
 # #            FUNCIONES            # #
 #######################################
 
+class RetryPolicy:
+    """
+    Política de reintentos acotada para las lecturas: número máximo de
+    intentos y espera exponencial con jitter entre ellos.
+    """
+
+    def __init__ (self, max_attempts=3, base_delay=0.2, max_delay=2.0,
+                  jitter=True):
+        """
+        :param max_attempts: Intentos como máximo por lectura.
+        :param base_delay: Espera (s) tras el primer fallo.
+        :param max_delay: Espera (s) máxima entre intentos.
+        :param jitter: Espera aleatoria entre 0 y el máximo calculado para
+        no sincronizar reintentos.
+        """
+        self.max_attempts = max(1, max_attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.jitter = jitter
+
+    def get_delay (self, attempt):
+        """
+        Devuelve la espera antes del siguiente intento.
+        :param attempt: Intento fallido (empezando en 0).
+        :return:
+        """
+        delay = min(self.max_delay, self.base_delay * (2 ** attempt))
+
+        return random.uniform(0, delay) if self.jitter else delay
+
+
 class SerialConnection:
     client = None
     DEBUG = False
 
+    # Momento (time.monotonic) en que se agota el tiempo del ciclo actual.
+    deadline = None
+
+    # Mantiene el puerto abierto entre lecturas en lugar de abrir/cerrar.
+    persistent = False
+
+    # Transacciones anidadas abiertas actualmente.
+    transaction_depth = 0
+
     def __init__ (self, debug=True, port='/dev/ttyUSB0', baudrate=9600,
-                  timeout=0.5, method='rtu'):
+                  timeout=0.5, method='rtu', persistent=False,
+                  retry_policy=None, client=None, record=None):
+        """
+        :param port: Puerto serial o "sim:opciones" para un dispositivo
+        simulado (ver Models/SimulatedRoverLi.py).
+        :param client: Cliente Modbus a usar en lugar de crear uno.
+        :param record: Archivo donde grabar una traza de las lecturas.
+        """
+        if client is None and port and port.startswith('sim:'):
+            from Models.SimulatedRoverLi import SimulatedRoverLiClient, \
+                parse_sim_port
+
+            options = {'timeout': timeout, 'baudrate': baudrate}
+            options.update(parse_sim_port(port))
+            client = SimulatedRoverLiClient(**options)
+
+        if client is None:
+            # Los reintentos los gestiona retry_policy, no pymodbus.
+            client = ModbusClient(method=method, port=port, stopbits=1,
+                                  bytesize=8, parity='N',
+                                  debug=debug,
+                                  auto_open=True,
+                                  retries=1,
+                                  baudrate=baudrate, timeout=timeout)
+
+        if record:
+            from Models.SimulatedRoverLi import RecordingClient
+
+            client = RecordingClient(client, record)
 
-        self.client = ModbusClient(method=method, port=port, stopbits=1,
-                                   bytesize=8, parity='N',
-                                   debug=debug,
-                                   auto_open=True,
-                                   baudrate=baudrate, timeout=timeout)
+        self.client = client
 
         self.DEBUG = debug
+        self.persistent = persistent
+        self.retry_policy = retry_policy or RetryPolicy()
+
+        # Serializa el acceso al bus entre los dispositivos de este puerto.
+        self.lock = threading.RLock()
 
     def connect (self):
         """
@@ -90,18 +164,163 @@ class SerialConnection:
         """
         return self.client.close()
 
-    def read_register (self, register, bits=2, type_data=None):
+    def is_connected (self):
         """
-        Lee un registro y devuelve su resultado.
-        :param register:
+        Comprueba si el puerto serial sigue abierto y utilizable.
+        :return:
+        """
+        try:
+            return bool(self.client.is_socket_open())
+        except Exception:
+            return False
+
+    def ensure_connection (self):
+        """
+        Abre la conexión solo si no está ya abierta.
         :return:
         """
-        self.connect()
-        response = self.client.read_holding_registers(register, bits, unit=1)
+        if self.is_connected():
+            return True
+
+        if self.DEBUG:
+            print('Abriendo conexión con el puerto serial')
+
+        return self.connect()
+
+    def reconnect (self):
+        """
+        Cierra y vuelve a abrir la conexión tras un error de entrada/salida.
+        :return:
+        """
+        if self.DEBUG:
+            print('Reconectando con el puerto serial')
+
         self.close()
 
+        return self.connect()
+
+    def keeps_open (self):
+        """
+        Indica si la conexión debe quedar abierta tras cada lectura.
+        :return:
+        """
+        return self.persistent or self.transaction_depth > 0
+
+    def time_left (self):
+        """
+        Segundos que quedan del tiempo del ciclo, None si no hay límite.
+        :return:
+        """
+        if self.deadline is None:
+            return None
+
+        return self.deadline - time.monotonic()
+
+    @contextmanager
+    def transaction (self, budget=None):
+        """
+        Agrupa varias lecturas (por ejemplo un ciclo completo) sobre una
+        misma conexión abierta, cerrándola al terminar si no es persistente.
+        Mientras dura, ningún otro dispositivo del mismo puerto usa el bus.
+
+        with serial.transaction(budget=20):
+            serial.read_register(0x0100, 34)
+
+        :param budget: Segundos máximos para todas las lecturas, al agotarse
+        las lecturas restantes devuelven None sin tocar el bus.
+        """
+        with self.lock:
+            outermost = self.transaction_depth == 0
+            self.transaction_depth += 1
+
+            if outermost and budget:
+                self.deadline = time.monotonic() + budget
+
+            try:
+                self.ensure_connection()
+
+                yield self
+            finally:
+                self.transaction_depth -= 1
+
+                if outermost:
+                    self.deadline = None
+
+                if not self.keeps_open():
+                    self.close()
+
+    def read_register (self, register, bits=2, type_data=None, unit=1):
+        """
+        Lee un registro y devuelve su resultado, reintentando según
+        retry_policy sin sobrepasar el tiempo del ciclo.
+        :param register:
+        :param unit: Id Modbus del dispositivo en el bus.
+        :return: Lista de valores o None si no se ha podido leer.
+        """
+        policy = self.retry_policy
+
+        with self.lock:
+            for attempt in range(policy.max_attempts):
+                remaining = self.time_left()
+
+                if remaining is not None and remaining <= 0:
+                    if self.DEBUG:
+                        print('Sin tiempo en el ciclo para leer:', register)
+
+                    return None
+
+                value = self.read_register_once(register, bits, unit)
+
+                if value is not None:
+                    return value
+
+                if attempt + 1 < policy.max_attempts:
+                    delay = policy.get_delay(attempt)
+
+                    if remaining is not None:
+                        delay = min(delay, remaining)
+
+                    time.sleep(delay)
+
+            return None
+
+    def read_register_once (self, register, bits=2, unit=1):
+        """
+        Realiza un único intento de lectura.
+        :param register:
+        :param unit: Id Modbus del dispositivo en el bus.
+        :return: Lista de valores o None si ha fallado.
+        """
+        keep_open = self.keeps_open()
+
+        try:
+            if keep_open:
+                self.ensure_connection()
+            else:
+                self.connect()
+
+            response = self.client.read_holding_registers(register, bits,
+                                                          unit=unit)
+        except (ConnectionException, OSError) as e:
+            if self.DEBUG:
+                print('Error de conexión al leer el registro:', register, e)
+
+            # El siguiente intento reabrirá el puerto.
+            self.close()
+
+            return None
+        finally:
+            if not keep_open:
+                self.close()
+
+        # Tras un fallo de E/S la siguiente lectura reabrirá el puerto.
+        if keep_open and isinstance(response, ModbusIOException):
+            self.close()
+
+        # ModbusIOException no tiene function_code, se muestra el error.
         if response.isError() and self.DEBUG:
-            print("Error: " + str(response.function_code))
+            print("Error: " + str(getattr(response, 'function_code',
+                                          response)))
         elif self.DEBUG and response.registers:
             msg = "Registro: {}, Valor: {}".format(register, response.registers)
             print(msg)
@@ -0,0 +1,390 @@
+#!/usr/bin/python3
+# -*- encoding: utf-8 -*-
+
+# @author     Raúl Caro Pastorino
+# @email      dev@fryntiz.es
+# @web        https://fryntiz.es
+# @gitlab     https://gitlab.com/fryntiz
+# @github     https://github.com/fryntiz
+# @twitter    https://twitter.com/fryntiz
+# @telegram   https://t.me/fryntiz
+
+# Create Date: 2026
+# Project Name:
+# Description:
+#
+# Dependencies:
+#
+# Revision 0.01 - File Created
+# Additional Comments:
+
+# @copyright  Copyright © 2022 Raúl Caro Pastorino
+# @license    https://wwww.gnu.org/licenses/gpl.txt
+
+# Copyright (C) 2022  Raúl Caro Pastorino
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+# Guía de estilos aplicada: PEP8
+
+#######################################
+# #           Descripción           # #
+#######################################
+## Controlador Renogy Rover Li simulado para probar y medir SerialConnection
+## y RenogyRoverLi sin hardware. Sustituye al cliente Modbus de pymodbus y
+## responde con un mapa de registros realista, latencia según el baudrate,
+## timeouts y errores CRC configurables, o reproduce una traza grabada.
+##
+## Se selecciona con un puerto "sim:" en PORT o en CONTROLLERS_CONFIG:
+##     sim:latency=0.02,timeouts=0.01,crc=0.01,seed=1
+##     sim:replay=traces/rover.jsonl
+##
+
+#######################################
+# #       Importar Librerías        # #
+#######################################
+
+from pymodbus.exceptions import ModbusIOException
+from pymodbus.pdu import ExceptionResponse
+from pymodbus.register_read_message import ReadHoldingRegistersResponse
+import json
+import math
+import random
+import threading
+import time
+
+#######################################
+# #             Variables           # #
+#######################################
+
+# Código de función read_holding_registers y excepción de dirección ilegal
+READ_HOLDING_REGISTERS = 0x03
+ILLEGAL_DATA_ADDRESS = 0x02
+
+# Bits por byte en el bus: inicio, 8 de datos y parada
+BITS_PER_BYTE = 10
+
+#######################################
+# #            FUNCIONES            # #
+#######################################
+
+
+def parse_sim_port (port):
+    """
+    Convierte un puerto "sim:clave=valor,..." en los parámetros del cliente
+    simulado.
+    :param port: Puerto indicado en la configuración.
+    :return: Diccionario con los parámetros.
+    """
+    options = {}
+    conversions = {
+        'latency': float,
+        'timeouts': float,
+        'crc': float,
+        'timeout': float,
+        'baudrate': int,
+        'seed': int,
+        'replay': str,
+    }
+
+    for option in port[len('sim:'):].split(','):
+        if not option:
+            continue
+
+        key, _, value = option.partition('=')
+
+        if key not in conversions:
+            raise ValueError('Opción desconocida para el puerto simulado: ' +
+                             key)
+
+        options[key] = conversions[key](value)
+
+    return options
+
+
+def make_rover_registers (rnd, now=None):
+    """
+    Genera el mapa de registros de un Rover Li de 24V/40A con valores
+    realistas, con la producción solar siguiendo la hora del día.
+    :param rnd: random.Random para el ruido de las lecturas.
+    :param now: Momento (epoch) de la lectura.
+    :return: Diccionario {dirección: valor}.
+    """
+    now = time.time() if now is None else now
+    hour = time.localtime(now).tm_hour + time.localtime(now).tm_min / 60
+
+    # Curva solar entre las 7 y las 21 h con algo de ruido de nubes.
+    sun = max(0.0, math.sin(math.pi * (hour - 7) / 14))
+    sun *= rnd.uniform(0.85, 1.0)
+
+    solar_voltage = int((12.3 + 29 * sun) * 10) if sun else rnd.randint(0, 60)
+    solar_current = int(sun * 800)
+    battery_voltage = int(rnd.uniform(25.2, 27.6) * 10)
+    load_current = rnd.randint(20, 150)
+
+    registers = {address: 0 for address in range(0x000A, 0x0022)}
+    registers.update({address: 0 for address in range(0x0100, 0x0122)})
+    registers.update({address: 0 for address in range(0xE000, 0xE021)})
+
+    # Tensión (V) y corriente (A) nominales del sistema
+    registers[0x000A] = (24 << 8) | 40
+
+    # Modelo en ASCII, 16 bytes
+    model = ' RNG-CTRL-RVR40'.ljust(16).encode('ascii')
+
+    for n in range(8):
+        registers[0x000C + n] = (model[2 * n] << 8) | model[2 * n + 1]
+
+    # Versiones de software V1.2.3 y hardware V2.0.1
+    registers[0x0014], registers[0x0015] = 0x0001, 0x0203
+    registers[0x0016], registers[0x0017] = 0x0002, 0x0001
+
+    # Número de serie y dirección Modbus
+    registers[0x0018], registers[0x0019] = 2106, 1042
+    registers[0x001A] = 1
+
+    registers[0x0100] = min(100, (battery_voltage - 240) * 3)
+    registers[0x0101] = battery_voltage
+    registers[0x0102] = solar_current
+    registers[0x0103] = (rnd.randint(25, 40) << 8) | rnd.randint(15, 25)
+    registers[0x0104] = battery_voltage
+    registers[0x0105] = load_current
+    registers[0x0106] = battery_voltage * load_current // 1000
+    registers[0x0107] = solar_voltage
+    registers[0x0108] = solar_current
+    registers[0x0109] = solar_voltage * solar_current // 1000
+
+    # Datos del día
+    registers[0x010B] = 248
+    registers[0x010C] = 284
+    registers[0x010D] = 812
+    registers[0x010E] = 410
+    registers[0x010F] = 232
+    registers[0x0110] = 110
+    registers[0x0111] = 42
+    registers[0x0112] = 18
+    registers[0x0113] = 1020
+    registers[0x0114] = 430
+
+    # Históricos, los contadores de 32 bits superan 65535
+    registers[0x0115] = 812
+    registers[0x0116] = 3
+    registers[0x0117] = 640
+    registers[0x0118], registers[0x0119] = 0x0001, 0x3A2C
+    registers[0x011A], registers[0x011B] = 0x0000, 0xF1E0
+    registers[0x011C], registers[0x011D] = 0x0002, 0x1F40
+    registers[0x011E], registers[0x011F] = 0x0001, 0x0BB8
+
+    # Luz de calle apagada y estado de carga mppt o floating
+    registers[0x0120] = 2 if sun else 5
+
+    # Capacidad nominal (Ah) y tipo de batería (litio)
+    registers[0xE002] = 200
+    registers[0xE004] = 4
+
+    return registers
+
+
+class SimulatedRoverLiClient:
+    """
+    Cliente con la misma interfaz que ModbusSerialClient usada por
+    SerialConnection, respondiendo como un Rover Li en el bus.
+    """
+
+    def __init__ (self, latency=0.0, timeouts=0.0, crc=0.0, timeout=0.5,
+                  baudrate=9600, seed=None, replay=None):
+        """
+        :param latency: Segundos de procesado del dispositivo por petición.
+        :param timeouts: Probabilidad (0-1) de que una petición no responda.
+        :param crc: Probabilidad (0-1) de una respuesta con CRC erróneo.
+        :param timeout: Segundos que se espera a una petición sin respuesta.
+        :param baudrate: Velocidad del bus para el tiempo de transmisión.
+        :param seed: Semilla para que las ejecuciones sean reproducibles.
+        :param replay: Traza JSON lines grabada con RecordingClient.
+        """
+        self.latency = latency
+        self.timeouts = timeouts
+        self.crc = crc
+        self.timeout = timeout
+        self.baudrate = baudrate
+        self.rnd = random.Random(seed)
+        self.connected = False
+
+        # Peticiones atendidas, para los benchmarks.
+        self.requests = 0
+
+        self.trace = self.load_trace(replay) if replay else None
+        self.trace_position = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def load_trace (path):
+        """
+        Carga una traza grabada.
+        :param path: Ruta al archivo JSON lines.
+        :return: Lista de peticiones con su respuesta.
+        """
+        with open(path) as file:
+            return [json.loads(line) for line in file if line.strip()]
+
+    def connect (self):
+        """
+        Abre la conexión simulada.
+        :return:
+        """
+        self.connected = True
+
+        return True
+
+    def close (self):
+        """
+        Cierra la conexión simulada.
+        :return:
+        """
+        self.connected = False
+
+    def is_socket_open (self):
+        """
+        Indica si la conexión simulada está abierta.
+        :return:
+        """
+        return self.connected
+
+    def transfer_time (self, count):
+        """
+        Segundos que tardan petición y respuesta en viajar por el bus.
+        :param count: Registros de la respuesta.
+        :return:
+        """
+        # Petición de 8 bytes y respuesta de 5 bytes más los registros.
+        frame_bytes = 8 + 5 + 2 * count
+
+        return frame_bytes * BITS_PER_BYTE / self.baudrate
+
+    def next_from_trace (self, address, count, unit):
+        """
+        Devuelve la siguiente respuesta de la traza para la petición,
+        volviendo al principio al terminar.
+        :return: Tupla (espera en segundos, respuesta).
+        """
+        with self.lock:
+            entry = self.trace[self.trace_position]
+            self.trace_position = (self.trace_position + 1) % len(self.trace)
+
+        if (entry['address'], entry['count']) != (address, count):
+            raise ValueError('La traza no coincide con la petición: ' +
+                             hex(address) + ' ' + str(count))
+
+        elapsed = entry.get('elapsed', 0)
+
+        if entry.get('error') == 'exception':
+            response = ExceptionResponse(READ_HOLDING_REGISTERS,
+                                         entry.get('code',
+                                                   ILLEGAL_DATA_ADDRESS))
+            response.unit_id = unit
+        elif entry.get('error'):
+            response = ModbusIOException(entry['error'])
+        else:
+            response = ReadHoldingRegistersResponse(entry['registers'])
+            response.unit_id = unit
+
+        return elapsed, response
+
+    def read_holding_registers (self, address, count=1, unit=1, **kwargs):
+        """
+        Atiende una lectura como lo haría el dispositivo.
+        :param address: Dirección del primer registro.
+        :param count: Cantidad de registros.
+        :param unit: Id Modbus del dispositivo en el bus.
+        :return: Respuesta de pymodbus o ModbusIOException.
+        """
+        self.requests += 1
+
+        if self.trace is not None:
+            elapsed, response = self.next_from_trace(address, count, unit)
+            time.sleep(elapsed)
+
+            return response
+
+        if self.rnd.random() < self.timeouts:
+            time.sleep(self.timeout)
+
+            return ModbusIOException('No response received (simulated)')
+
+        time.sleep(self.latency + self.transfer_time(count))
+
+        if self.rnd.random() < self.crc:
+            return ModbusIOException('CRC error (simulated)')
+
+        registers = make_rover_registers(self.rnd)
+        addresses = range(address, address + count)
+
+        if any(register not in registers for register in addresses):
+            response = ExceptionResponse(READ_HOLDING_REGISTERS,
+                                         ILLEGAL_DATA_ADDRESS)
+        else:
+            response = ReadHoldingRegistersResponse(
+                [registers[register] for register in addresses])
+
+        response.unit_id = unit
+
+        return response
+
+
+class RecordingClient:
+    """
+    Envuelve un cliente Modbus guardando cada petición y su respuesta en
+    una traza JSON lines para reproducirla después con
+    SimulatedRoverLiClient(replay=...).
+    """
+
+    def __init__ (self, client, path):
+        """
+        :param client: Cliente Modbus real.
+        :param path: Archivo donde añadir la traza.
+        """
+        self.client = client
+        self.path = path
+
+    def __getattr__ (self, name):
+        # connect(), close()... se delegan en el cliente real.
+        return getattr(self.client, name)
+
+    def read_holding_registers (self, address, count=1, unit=1, **kwargs):
+        """
+        Lee con el cliente real y añade la petición a la traza.
+        :return: Respuesta del cliente real.
+        """
+        start = time.monotonic()
+        response = self.client.read_holding_registers(address, count,
+                                                      unit=unit, **kwargs)
+
+        entry = {
+            'address': address,
+            'count': count,
+            'elapsed': round(time.monotonic() - start, 4),
+        }
+
+        if isinstance(response, ExceptionResponse):
+            entry['error'] = 'exception'
+            entry['code'] = response.exception_code
+        elif response.isError():
+            entry['error'] = str(response)
+        else:
+            entry['registers'] = response.registers
+
+        with open(self.path, 'a') as file:
+            file.write(json.dumps(entry) + '\n')
+
+        return response
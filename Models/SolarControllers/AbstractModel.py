@@ -49,16 +49,279 @@
 #######################################
 
 from abc import ABC, abstractmethod
+import functools
+import struct
+import time
 
 
 #######################################
 # #            FUNCIONES            # #
 #######################################
 
+def snapshot_field (getter):
+    """
+    Memoriza el resultado de un getter durante el ciclo de lectura actual, de
+    forma que llamadas repetidas no vuelvan a decodificar ni leer registros.
+    :param getter: Método del modelo que devuelve el valor de un campo.
+    :return:
+    """
+    @functools.wraps(getter)
+    def wrapper (self):
+        snapshot = self.snapshot
+
+        if snapshot is None:
+            return getter(self)
+
+        name = getter.__name__
+
+        if name not in snapshot.fields:
+            snapshot.fields[name] = getter(self)
+
+        return snapshot.fields[name]
+
+    return wrapper
+
+
+def field_decoder (scheme, model=None):
+    """
+    Genera la función que convierte los registros de un campo de sectionMap
+    en su valor según los metadatos de decodificación del campo:
+
+    - 'offset': Palabra dentro de los registros del campo (por defecto 0).
+    - 'words': 1 para 16 bits o 2 para 32 bits (palabra alta primero). Con
+      'digits' es la cantidad de palabras a concatenar (por defecto todas).
+    - 'byte': 'high' o 'low' para tomar solo ese byte de la palabra.
+    - 'signed': El bit 7 del byte es el signo (b0-b6 el valor absoluto).
+    - 'scale': Factor por el que se multiplica (0.1, 0.01…).
+    - 'enum': Atributo del modelo con el diccionario de etiquetas.
+    - 'format': 'version' (VX.Y.Z), 'digits' (palabras concatenadas) o
+      'ascii' (texto) en lugar de un valor numérico.
+
+    :param scheme: Diccionario del campo en sectionMap.
+    :param model: Modelo del que tomar los diccionarios de 'enum'.
+    :return: Función que recibe la lista de registros del campo.
+    """
+    offset = scheme.get('offset', 0)
+    words = scheme.get('words', 1)
+    byte = scheme.get('byte')
+    signed = scheme.get('signed', False)
+    scale = scheme.get('scale')
+    enum = getattr(model, scheme['enum']) if scheme.get('enum') else None
+    output = scheme.get('format')
+
+    if output == 'version':
+        return lambda values: 'V{}.{}.{}'.format(values[offset] & 0x00ff,
+                                                 values[offset + 1] >> 8,
+                                                 values[offset + 1] & 0x00ff)
+
+    if output == 'digits':
+        end = offset + scheme['words'] if 'words' in scheme else None
+
+        return lambda values: ''.join(str(value)
+                                      for value in values[offset:end])
+
+    if output == 'ascii':
+        return lambda values: b''.join(
+            value.to_bytes(2, 'big') for value in values[offset:]
+        ).decode('ascii', 'ignore').strip('\x00 ')
+
+    # Con escala 0.1 divido entre 10 para obtener el mismo valor exacto que
+    # al dividir a mano, multiplicar por 0.1 arrastra error de redondeo.
+    divisor = round(1 / scale) if scale else None
+
+    def decode (values):
+        if words == 2:
+            value = (values[offset] << 16) | values[offset + 1]
+        else:
+            value = values[offset]
+
+        if byte == 'high':
+            value >>= 8
+        elif byte == 'low':
+            value &= 0x00ff
+
+        if signed and value & 0x80:
+            value = -(value & 0x7f)
+
+        if divisor:
+            value = float(value) / divisor
+
+        if enum is not None:
+            return enum.get(value)
+
+        return value
+
+    return decode
+
+
+class RegisterBlockDecoder:
+    """
+    Decodifica de una sola vez todos los campos de sectionMap contenidos en
+    un bloque de registros mediante un struct.Struct precompilado.
+
+    Cada campo numérico ocupa en el formato su byte ('B'), palabra ('H') o
+    doble palabra ('I') y los registros sin usar se saltan con relleno. Los
+    campos de texto o que solapan con otro ya colocado se decodifican aparte
+    con su field_decoder().
+    """
+
+    def __init__ (self, model, start, count):
+        """
+        :param model: Modelo con el sectionMap a compilar.
+        :param start: Dirección del primer registro del bloque.
+        :param count: Cantidad de registros del bloque.
+        """
+        self.start = start
+        self.count = count
+
+        # Convierte la lista de registros al buffer que se desempaqueta.
+        self.words = struct.Struct('>{}H'.format(count))
+
+        fields = []
+        self.fallback = []
+
+        for name, scheme in model.sectionMap.items():
+            address = scheme['address']
+
+            if address < start or address + scheme['bytes'] > start + count:
+                continue
+
+            if scheme.get('format'):
+                self.fallback.append((name, address - start,
+                                      scheme['bytes'],
+                                      field_decoder(scheme, model)))
+                continue
+
+            position = (address - start + scheme.get('offset', 0)) * 2
+
+            if scheme.get('byte'):
+                code, size = 'B', 1
+                position += 1 if scheme['byte'] == 'low' else 0
+            elif scheme.get('words', 1) == 2:
+                code, size = 'I', 4
+            else:
+                code, size = 'H', 2
+
+            fields.append((position, size, code, name, scheme))
+
+        layout = ''
+        cursor = 0
+        self.names = []
+        self.post = []
+
+        for position, size, code, name, scheme in sorted(fields):
+            # Dos campos sobre los mismos bytes no caben en un formato.
+            if position < cursor:
+                address = scheme['address']
+                self.fallback.append((name, address - start, scheme['bytes'],
+                                      field_decoder(scheme, model)))
+                continue
+
+            if position > cursor:
+                layout += '{}x'.format(position - cursor)
+
+            layout += code
+            cursor = position + size
+            self.names.append(name)
+            self.post.append(self.compile_post(scheme, model))
+
+        self.struct = struct.Struct('>' + layout)
+
+    @staticmethod
+    def compile_post (scheme, model):
+        """
+        Devuelve la transformación a aplicar tras desempaquetar un campo
+        (signo, escala y etiquetas) o None si el valor se usa tal cual.
+        :param scheme: Diccionario del campo en sectionMap.
+        :param model: Modelo del que tomar los diccionarios de 'enum'.
+        :return:
+        """
+        signed = scheme.get('signed', False)
+        scale = scheme.get('scale')
+        enum = getattr(model, scheme['enum']) if scheme.get('enum') else None
+
+        if not (signed or scale or enum is not None):
+            return None
+
+        divisor = round(1 / scale) if scale else None
+
+        def post (value):
+            if signed and value & 0x80:
+                value = -(value & 0x7f)
+
+            if divisor:
+                value = float(value) / divisor
+
+            return enum.get(value) if enum is not None else value
+
+        return post
+
+    def decode (self, data):
+        """
+        Decodifica el buffer con los registros del bloque en big-endian.
+        :param data: bytes o memoryview con 2 * count bytes.
+        :return: Diccionario {campo: valor}.
+        """
+        values = self.struct.unpack_from(data)
+
+        datas = {
+            name: value if post is None else post(value)
+            for name, value, post in zip(self.names, values, self.post)
+        }
+
+        if self.fallback:
+            words = self.words.unpack_from(data)
+
+            for name, offset, count, decode in self.fallback:
+                datas[name] = decode(words[offset:offset + count])
+
+        return datas
+
+    def decode_words (self, registers):
+        """
+        Decodifica la lista de registros del bloque tal como la devuelve
+        pymodbus.
+        :param registers: Lista con count valores de 16 bits.
+        :return: Diccionario {campo: valor}.
+        """
+        return self.decode(self.words.pack(*registers))
+
+
+class PollSnapshot:
+    """
+    Valores leídos del controlador durante un único ciclo de lectura. Se
+    descarta al comenzar el siguiente ciclo.
+    """
+
+    def __init__ (self):
+        # Registros físicos leídos {dirección: valor}
+        self.registers = {}
+
+        # Direcciones leídas del dispositivo en este ciclo (no de caché)
+        self.fresh = set()
+
+        # Campos que tocaba leer en este ciclo
+        self.due = set()
+
+        # Campos que tocaba leer y no se han leído en bloque
+        self.unread = set()
+
+        # Campos servidos con el último valor conocido al fallar la lectura
+        # (stale) y campos sin ningún valor disponible (missing).
+        self.stale = set()
+        self.missing = set()
+
+        # Resultados de los getters {nombre del getter: valor}
+        self.fields = {}
+
+
 class AbstractModel(ABC):
     serial = None
     DEBUG = False
 
+    # Id Modbus del dispositivo en el bus serial
+    unit = 1
+
     """
     Tipos de baterías.
     """
@@ -83,10 +346,57 @@ class AbstractModel(ABC):
         6: 'current limiting'
     }
 
+    """
+    Cantidad máxima de registros por petición read_holding_registers según la
+    especificación Modbus.
+    """
+    MODBUS_MAX_REGISTERS = 125
+
+    """
+    Registros sin usar que se permiten leer entre dos rangos para unirlos en
+    un mismo bloque (0 → solo rangos contiguos o solapados).
+    """
+    REGISTER_MAX_GAP = 0
+
+    """
+    Segundos entre relecturas de cada clase de refresco indicada en la clave
+    'refresh' de sectionMap (None → se lee una sola vez, 0 → cada ciclo).
+    """
+    REFRESH_INTERVALS = {
+        'static': None,
+        'slow': 900,
+        'live': 0,
+    }
+
+    # Instantánea del ciclo de lectura en curso (PollSnapshot)
+    snapshot = None
+
+    # Últimos registros leídos entre ciclos {dirección: valor}
+    cached_registers = None
+
+    # Momento (time.monotonic) de la última lectura de cada campo
+    refreshed_at = None
+
+    # Segundos máximos por ciclo de lectura antes de dejar de leer registros
+    poll_budget = 20
+
+    # Decodificadores de sectionMap compilados una vez por modelo
+    # {nombre: (dirección, registros, función)}
+    decoder = None
+
+    # Decodificadores por bloque planificado {(dirección, registros): ...}
+    block_decoders = None
+
+    # Columnas de tablemodel() en orden, calculadas una vez por modelo
+    columns = None
+
     @property
     def sectionMap (self):
         """
-        Devuelve un diccionario con los datos de la sección.
+        Devuelve un diccionario con los datos de la sección. Cada campo
+        indica 'address', 'bytes', 'type' y su clase de refresco en
+        'refresh' (static, slow o live). Las claves de decodificación
+        se describen en field_decoder().
         :return:
         """
         pass
@@ -99,6 +409,344 @@ class AbstractModel(ABC):
         """
         pass
 
+    def plan_register_blocks (self, names=None):
+        """
+        Agrupa los rangos de direcciones de sectionMap, uniendo los contiguos
+        y solapados, en el menor número de lecturas que respetan el límite de
+        registros por petición Modbus.
+        :param names: Campos de sectionMap a incluir (por defecto todos).
+        :return: Lista de tuplas (dirección inicial, cantidad de registros).
+        """
+        ranges = sorted(
+            (scheme['address'], scheme['address'] + scheme['bytes'])
+            for name, scheme in self.sectionMap.items()
+            if names is None or name in names
+        )
+
+        blocks = []
+
+        for start, end in ranges:
+            if blocks:
+                block_start, block_end = blocks[-1]
+
+                if start <= block_end + self.REGISTER_MAX_GAP and \
+                        end - block_start <= self.MODBUS_MAX_REGISTERS:
+                    blocks[-1] = (block_start, max(block_end, end))
+                    continue
+
+            # Rangos más grandes que el límite se dividen en varias lecturas.
+            while end - start > self.MODBUS_MAX_REGISTERS:
+                blocks.append((start, start + self.MODBUS_MAX_REGISTERS))
+                start += self.MODBUS_MAX_REGISTERS
+
+            blocks.append((start, end))
+
+        return [(start, end - start) for start, end in blocks]
+
+    def begin_poll (self):
+        """
+        Comienza un nuevo ciclo de lectura descartando los valores del
+        ciclo anterior.
+        :return: La nueva instantánea.
+        """
+        self.snapshot = PollSnapshot()
+
+        return self.snapshot
+
+    def get_due_sections (self, now=None):
+        """
+        Devuelve los campos de sectionMap cuyo intervalo de refresco ha
+        expirado y deben leerse de nuevo en este ciclo.
+        :param now: Momento actual según time.monotonic().
+        :return: Lista con los nombres de los campos.
+        """
+        now = time.monotonic() if now is None else now
+        refreshed_at = self.refreshed_at or {}
+        due = []
+
+        for name, scheme in self.sectionMap.items():
+            interval = self.REFRESH_INTERVALS.get(
+                scheme.get('refresh', 'live'), 0)
+            last = refreshed_at.get(name)
+
+            if last is None or (interval is not None and
+                                now - last >= interval):
+                due.append(name)
+
+        return due
+
+    def poll_registers (self):
+        """
+        Comienza un ciclo de lectura leyendo solo los campos cuyo intervalo
+        de refresco ha expirado y sirviendo el resto desde la caché.
+        :return: Diccionario {dirección: valor} con los registros del ciclo.
+        """
+        if self.cached_registers is None:
+            self.cached_registers = {}
+            self.refreshed_at = {}
+
+        now = time.monotonic()
+        due = self.get_due_sections(now)
+        snapshot = self.begin_poll()
+        snapshot.due.update(due)
+
+        # Los campos no caducados se sirven con su último valor leído.
+        snapshot.registers.update(self.cached_registers)
+
+        if due:
+            self.read_register_blocks(due)
+
+        for name in due:
+            scheme = self.sectionMap[name]
+            addresses = range(scheme['address'],
+                              scheme['address'] + scheme['bytes'])
+
+            if all(address in snapshot.fresh for address in addresses):
+                self.refreshed_at[name] = now
+            else:
+                snapshot.unread.add(name)
+
+        self.decode_snapshot()
+
+        return snapshot.registers
+
+    def store_registers (self, address, values):
+        """
+        Guarda en la instantánea del ciclo los registros leídos a partir de
+        una dirección.
+        :param address: Dirección del primer registro.
+        :param values: Valores leídos.
+        """
+        snapshot = self.snapshot
+
+        if snapshot is None:
+            return
+
+        for offset, value in enumerate(values):
+            snapshot.registers[address + offset] = value
+            snapshot.fresh.add(address + offset)
+
+            if self.cached_registers is not None:
+                self.cached_registers[address + offset] = value
+
+    def read_register_blocks (self, names=None):
+        """
+        Lee en bloque todos los registros planificados y los deja en la
+        instantánea del ciclo para que los getters decodifiquen desde ahí.
+        :param names: Campos de sectionMap a incluir (por defecto todos).
+        :return: Diccionario {dirección: valor} con los registros leídos.
+        """
+        if self.snapshot is None:
+            self.begin_poll()
+
+        for address, count in self.plan_register_blocks(names):
+            if self.DEBUG:
+                print('Leyendo bloque de registros:', hex(address), count)
+
+            response = self.serial.read_register(address, count,
+                                                 unit=self.unit)
+
+            # Si falla el bloque, cada campo se leerá individualmente.
+            if response:
+                self.store_registers(address, response)
+
+        return self.snapshot.registers
+
+    def read_section (self, name):
+        """
+        Devuelve los registros de un campo de sectionMap, desde la
+        instantánea del ciclo si ya se leyeron o desde el dispositivo.
+
+        Si la lectura falla se devuelve el último valor conocido marcando el
+        campo como stale, o None marcándolo como missing.
+        :param name: Nombre del campo en sectionMap.
+        :return: Lista de registros o None si no se ha podido leer.
+        """
+        scheme = self.sectionMap[name]
+        address = scheme['address']
+        addresses = range(address, address + scheme['bytes'])
+        snapshot = self.snapshot
+
+        if snapshot is not None:
+            values = [snapshot.registers.get(register)
+                      for register in addresses]
+
+            # Un campo que tocaba leer solo vale si se leyó en este ciclo.
+            is_fresh = name not in snapshot.due or \
+                all(register in snapshot.fresh for register in addresses)
+
+            if None not in values and is_fresh:
+                return values
+
+        response = self.serial.read_register(address, scheme['bytes'],
+                                             scheme['type'], unit=self.unit)
+
+        # Memorizo lo leído para no repetir la lectura en este ciclo.
+        if response:
+            self.store_registers(address, response)
+
+            return response
+
+        if snapshot is not None:
+            if None not in values:
+                snapshot.stale.add(name)
+
+                return values
+
+            snapshot.missing.add(name)
+
+        return None
+
+    def get_decoder (self):
+        """
+        Devuelve la tabla de decodificadores de sectionMap, compilándola la
+        primera vez que se usa en cada modelo.
+        :return: Diccionario {nombre: (dirección, registros, función)}.
+        """
+        model = type(self)
+        decoder = model.__dict__.get('decoder')
+
+        if decoder is None:
+            decoder = {
+                name: (scheme['address'], scheme['bytes'],
+                       field_decoder(scheme, self))
+                for name, scheme in self.sectionMap.items()
+            }
+
+            model.decoder = decoder
+
+        return decoder
+
+    def decode_registers (self, registers, names=None):
+        """
+        Decodifica de una pasada los campos de sectionMap a partir de un
+        volcado de registros, sin leer del dispositivo.
+        :param registers: Diccionario {dirección: valor}.
+        :param names: Campos a incluir (por defecto todos).
+        :return: Diccionario {campo: valor}, None si faltan registros.
+        """
+        datas = {}
+
+        for name, (address, count, decode) in self.get_decoder().items():
+            if names is not None and name not in names:
+                continue
+
+            values = [registers.get(register)
+                      for register in range(address, address + count)]
+
+            datas[name] = None if None in values else decode(values)
+
+        return datas
+
+    def get_block_decoders (self):
+        """
+        Devuelve los decodificadores struct de los bloques en que se lee el
+        sectionMap completo, compilándolos la primera vez en cada modelo.
+        :return: Diccionario {(dirección, registros): RegisterBlockDecoder}.
+        """
+        model = type(self)
+        block_decoders = model.__dict__.get('block_decoders')
+
+        if block_decoders is None:
+            block_decoders = {
+                (start, count): RegisterBlockDecoder(self, start, count)
+                for start, count in self.plan_register_blocks()
+            }
+
+            model.block_decoders = block_decoders
+
+        return block_decoders
+
+    def decode_snapshot (self):
+        """
+        Decodifica con un único unpack por bloque los campos de la
+        instantánea del ciclo. Los campos que no se han podido leer quedan
+        fuera para que get_field() los reintente y marque.
+        """
+        snapshot = self.snapshot
+        registers = snapshot.registers
+
+        for (start, count), block in self.get_block_decoders().items():
+            try:
+                words = [registers[address]
+                         for address in range(start, start + count)]
+            except KeyError:
+                continue
+
+            for name, value in block.decode_words(words).items():
+                if name not in snapshot.unread:
+                    snapshot.fields.setdefault(name, value)
+
+    def get_field (self, name):
+        """
+        Devuelve el valor decodificado de un campo de sectionMap, leyéndolo
+        del dispositivo solo si no está en la instantánea del ciclo.
+        :param name: Nombre del campo en sectionMap.
+        :return: Valor del campo o None si no se ha podido leer.
+        """
+        snapshot = self.snapshot
+
+        if snapshot is not None and name in snapshot.fields:
+            return snapshot.fields[name]
+
+        decode = self.get_decoder()[name][2]
+        values = self.read_section(name)
+        value = decode(values) if values else None
+
+        if snapshot is not None:
+            snapshot.fields[name] = value
+
+        return value
+
+    def get_fields (self, names=None):
+        """
+        Devuelve los valores decodificados de varios campos de sectionMap.
+        :param names: Campos a incluir (por defecto todos).
+        :return: Diccionario {campo: valor}.
+        """
+        names = self.sectionMap.keys() if names is None else names
+
+        return {name: self.get_field(name) for name in names}
+
+    def get_poll_status (self):
+        """
+        Devuelve los campos sin dato actualizado en el último ciclo.
+        :return: Diccionario con las listas 'stale' y 'missing'.
+        """
+        if self.snapshot is None:
+            return {'stale': [], 'missing': []}
+
+        return {
+            'stale': sorted(self.snapshot.stale),
+            'missing': sorted(self.snapshot.missing),
+        }
+
+    def get_columns (self):
+        """
+        Devuelve las columnas de tablemodel() en su orden, calculándolas la
+        primera vez que se usan en cada modelo.
+        :return: Tupla con el nombre de las columnas.
+        """
+        model = type(self)
+        columns = model.__dict__.get('columns')
+
+        if columns is None:
+            columns = tuple(self.tablemodel().keys())
+            model.columns = columns
+
+        return columns
+
+    def build_row (self, datas, **values):
+        """
+        Construye la tupla a guardar con las columnas de tablemodel() en su
+        orden, descartando el resto de datos.
+        :param datas: Diccionario devuelto por get_all_datas().
+        :param values: Valores que sustituyen a los de datas (created_at).
+        :return: Tupla lista para insertar.
+        """
+        return tuple(values[column] if column in values else datas.get(column)
+                     for column in self.get_columns())
+
     @abstractmethod
     def get_today_historical_info_datas (self):
         """
@@ -0,0 +1,614 @@
+#!/usr/bin/python3
+# -*- encoding: utf-8 -*-
+
+# @author     Raúl Caro Pastorino
+# @email      dev@fryntiz.es
+# @web        https://fryntiz.es
+# @gitlab     https://gitlab.com/fryntiz
+# @github     https://github.com/fryntiz
+# @twitter    https://twitter.com/fryntiz
+# @telegram   https://t.me/fryntiz
+
+# Create Date: 2026
+# Project Name:
+# Description:
+#
+# Dependencies:
+#
+# Revision 0.01 - File Created
+# Additional Comments:
+
+# @copyright  Copyright © 2022 Raúl Caro Pastorino
+# @license    https://wwww.gnu.org/licenses/gpl.txt
+
+# Copyright (C) 2022  Raúl Caro Pastorino
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+# Guía de estilos aplicada: PEP8
+
+#######################################
+# #           Descripción           # #
+#######################################
+## Cola de lecturas en archivos de solo escritura al final (segmentos) como
+## alternativa a la base de datos cuando solo se guardan lecturas hasta
+## subirlas a la API. Ofrece los mismos métodos que usa main.py sobre
+## DbConnection y se selecciona con STORAGE=spool.
+##
+## Cada tabla es un directorio con segmentos 000000000001.seg, ... en los que
+## cada tupla es un registro [longitud][crc32][JSON]. Los fsync se agrupan
+## cada SPOOL_SYNC_ROWS tuplas o SPOOL_SYNC_SECONDS segundos, el cursor de lo
+## ya subido se guarda en cursor.json y los segmentos ya subidos se borran
+## enteros, sin reescribir nunca un archivo.
+##
+
+#######################################
+# #       Importar Librerías        # #
+#######################################
+
+from dotenv import load_dotenv
+import collections
+import datetime
+import functools
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+
+load_dotenv(override=True)
+
+#######################################
+# #             Variables           # #
+#######################################
+
+# Cabecera de cada registro: longitud del JSON y su crc32
+RECORD_HEADER = struct.Struct('>II')
+
+SEGMENT_SUFFIX = '.seg'
+
+#######################################
+# #            FUNCIONES            # #
+#######################################
+
+
+def synchronized (method):
+    """
+    Serializa el acceso a los segmentos desde los hilos de guardado y subida.
+    :param method:
+    :return:
+    """
+    @functools.wraps(method)
+    def wrapper (self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+
+    return wrapper
+
+
+def encode_value (value):
+    """
+    Convierte los valores que JSON no admite al guardar un registro.
+    :param value:
+    :return:
+    """
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+
+    return float(value)
+
+
+class SpoolTable:
+    """
+    Segmentos y cursor de una tabla de la cola.
+    """
+
+    def __init__ (self, path, columns, datetimes, segment_bytes,
+                  max_dropped=10000):
+        """
+        :param path: Directorio de la tabla.
+        :param columns: Columnas en orden, la primera es 'id'.
+        :param datetimes: Columnas DateTime a reconstruir al leer.
+        :param segment_bytes: Tamaño a partir del cual se rota el segmento.
+        :param max_dropped: Ids sueltos subidos a partir de los cuales se
+        abandonan las tuplas más antiguas que la API no llega a confirmar.
+        """
+        self.path = path
+        self.columns = columns
+        self.datetimes = datetimes
+        self.segment_bytes = segment_bytes
+        self.max_dropped = max_dropped
+        self.Row = collections.namedtuple('Row', columns, rename=True)
+
+        os.makedirs(path, exist_ok=True)
+
+        # Segmentos en orden [número, primer id, último id, bytes]
+        self.segments = []
+
+        # Ids subidos: todos hasta acked y los sueltos de dropped.
+        self.acked = 0
+        self.dropped = set()
+
+        # Número del próximo segmento, nunca se reutiliza uno ya borrado.
+        self.next_segment = 1
+        self.load_cursor()
+
+        self.last_id = self.acked
+        self.recover()
+
+        # Segmento abierto para escribir y tuplas sin fsync.
+        self.file = None
+        self.unsynced = 0
+        self.synced_at = time.monotonic()
+
+        # Posición tras la última lectura (id, segmento, offset) para
+        # continuar la cola sin recorrer el segmento desde el principio.
+        self.read_hint = None
+
+    def segment_path (self, number):
+        return os.path.join(self.path,
+                            '{:012d}{}'.format(number, SEGMENT_SUFFIX))
+
+    def cursor_path (self):
+        return os.path.join(self.path, 'cursor.json')
+
+    def load_cursor (self):
+        """
+        Carga el cursor de lo ya subido.
+        """
+        try:
+            with open(self.cursor_path()) as file:
+                cursor = json.load(file)
+        except FileNotFoundError:
+            return
+
+        self.acked = cursor.get('acked', 0)
+        self.dropped = set(cursor.get('dropped', []))
+        self.next_segment = cursor.get('next_segment', 1)
+
+    def save_cursor (self):
+        """
+        Guarda el cursor de forma atómica (archivo temporal y rename).
+        """
+        path = self.cursor_path()
+        tmp = path + '.tmp'
+
+        with open(tmp, 'w') as file:
+            json.dump({
+                'acked': self.acked,
+                'dropped': sorted(self.dropped),
+                'next_segment': self.next_segment,
+            }, file)
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.replace(tmp, path)
+
+    def read_records (self, number, offset=0):
+        """
+        Recorre los registros válidos de un segmento.
+        :param number: Número del segmento.
+        :param offset: Byte desde el que leer.
+        :return: Generador de tuplas (offset tras el registro, registro).
+        """
+        with open(self.segment_path(number), 'rb') as file:
+            file.seek(offset)
+
+            while True:
+                header = file.read(RECORD_HEADER.size)
+
+                if len(header) < RECORD_HEADER.size:
+                    return
+
+                length, crc = RECORD_HEADER.unpack(header)
+                payload = file.read(length)
+
+                # Registro a medias o dañado por un corte de luz.
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    return
+
+                offset += RECORD_HEADER.size + length
+
+                yield offset, json.loads(payload)
+
+    def recover (self):
+        """
+        Reconstruye el índice de segmentos y recorta el final del último si
+        quedó un registro incompleto.
+        """
+        numbers = sorted(
+            int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(self.path)
+            if name.endswith(SEGMENT_SUFFIX)
+        )
+
+        for number in numbers:
+            first_id = last_id = None
+            end = 0
+
+            for end, record in self.read_records(number):
+                first_id = record['id'] if first_id is None else first_id
+                last_id = record['id']
+
+            if end < os.path.getsize(self.segment_path(number)):
+                print('Recortando segmento dañado:', self.segment_path(number))
+
+                with open(self.segment_path(number), 'r+b') as file:
+                    file.truncate(end)
+
+            self.segments.append([number, first_id, last_id, end])
+            self.next_segment = max(self.next_segment, number + 1)
+
+            if last_id is not None:
+                self.last_id = max(self.last_id, last_id)
+
+    def open_segment (self):
+        """
+        Abre el último segmento para escribir o crea uno nuevo si no hay o
+        ya está lleno.
+        """
+        if not self.segments or self.segments[-1][3] >= self.segment_bytes:
+            number = self.next_segment
+            self.next_segment += 1
+            self.segments.append([number, None, None, 0])
+
+        self.file = open(self.segment_path(self.segments[-1][0]), 'ab')
+
+    def append (self, row):
+        """
+        Añade una tupla al final de la cola.
+        :param row: Diccionario con los valores de la tupla.
+        :return: Id asignado.
+        """
+        if self.file is None:
+            self.open_segment()
+
+        self.last_id += 1
+        row['id'] = self.last_id
+
+        payload = json.dumps(row, default=encode_value,
+                             separators=(',', ':')).encode('utf-8')
+
+        self.file.write(RECORD_HEADER.pack(len(payload),
+                                           zlib.crc32(payload)) + payload)
+
+        segment = self.segments[-1]
+        segment[1] = self.last_id if segment[1] is None else segment[1]
+        segment[2] = self.last_id
+        segment[3] += RECORD_HEADER.size + len(payload)
+        self.unsynced += 1
+
+        # Al llenarse el segmento se cierra y el siguiente va a otro nuevo.
+        if segment[3] >= self.segment_bytes:
+            self.sync()
+            self.file.close()
+            self.file = None
+
+        return self.last_id
+
+    def sync (self):
+        """
+        Fuerza a disco lo escrito en el segmento abierto.
+        """
+        if self.file is not None:
+            self.file.flush()
+
+            if self.unsynced:
+                os.fsync(self.file.fileno())
+
+        self.unsynced = 0
+        self.synced_at = time.monotonic()
+
+    def make_row (self, record):
+        """
+        Convierte un registro en una tupla con las columnas de la tabla.
+        :param record: Diccionario leído del segmento.
+        :return:
+        """
+        for name in self.datetimes:
+            if record.get(name):
+                record[name] = datetime.datetime.fromisoformat(record[name])
+
+        return self.Row(*(record.get(name) for name in self.columns))
+
+    def queue (self, limit, after_id=0):
+        """
+        Devuelve las tuplas pendientes de subir posteriores a un id.
+        :param limit: Cantidad máxima de tuplas.
+        :param after_id: Solo tuplas con id mayor a este.
+        :return: Lista de tuplas de la más antigua a la más reciente.
+        """
+        if self.file is not None:
+            self.file.flush()
+
+        start = max(after_id, self.acked)
+        rows = []
+
+        for number, first_id, last_id, size in self.segments:
+            if last_id is None or last_id <= start:
+                continue
+
+            offset = 0
+            hint = self.read_hint
+
+            if hint and hint[0] == start and hint[1] == number:
+                offset = hint[2]
+
+            for offset, record in self.read_records(number, offset):
+                record_id = record['id']
+
+                if record_id <= start or record_id in self.dropped:
+                    continue
+
+                rows.append(self.make_row(record))
+
+                if len(rows) >= limit:
+                    self.read_hint = (record_id, number, offset)
+
+                    return rows
+
+            if rows:
+                self.read_hint = (rows[-1].id, number, offset)
+
+        return rows
+
+    def drop (self, ids):
+        """
+        Marca como subidas las tuplas indicadas y borra los segmentos que ya
+        no tienen nada pendiente.
+        :param ids: Ids de las tuplas.
+        """
+        self.dropped.update(identifier for identifier in ids
+                            if identifier > self.acked)
+
+        while self.acked + 1 in self.dropped:
+            self.acked += 1
+            self.dropped.discard(self.acked)
+
+        # Una tupla que la API rechaza siempre deja acked parado y dropped
+        # crecería sin límite, se abandonan los huecos más antiguos.
+        while len(self.dropped) > self.max_dropped:
+            first = min(self.dropped)
+            print('Abandonando tuplas sin confirmar en', self.path,
+                  'ids', self.acked + 1, 'a', first - 1)
+            self.acked = first
+
+            self.dropped.discard(first)
+
+            while self.acked + 1 in self.dropped:
+                self.acked += 1
+                self.dropped.discard(self.acked)
+
+        # Si todo está subido también se descarta el segmento abierto.
+        if self.acked >= self.last_id and self.file is not None:
+            self.sync()
+            self.file.close()
+            self.file = None
+
+        while self.segments:
+            number, first_id, last_id, size = self.segments[0]
+            is_open = self.file is not None and \
+                self.file.name == self.segment_path(number)
+
+            if is_open or (last_id is not None and last_id > self.acked):
+                break
+
+            os.remove(self.segment_path(number))
+            self.segments.pop(0)
+
+            # La posición guardada apuntaba a un segmento que ya no existe.
+            if self.read_hint and self.read_hint[1] == number:
+                self.read_hint = None
+
+        self.save_cursor()
+
+    def close (self):
+        """
+        Fuerza lo pendiente a disco y cierra el segmento abierto.
+        """
+        self.sync()
+
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class SpoolConnection:
+    has_debug = os.getenv("DEBUG") == "True"
+
+    # Directorio de la cola
+    SPOOL_PATH = os.getenv("SPOOL_PATH", "spool")
+
+    # Se hace fsync al llegar a estas tuplas o segundos (0 → sin límite)
+    SPOOL_SYNC_ROWS = int(os.getenv("SPOOL_SYNC_ROWS", 100))
+    SPOOL_SYNC_SECONDS = float(os.getenv("SPOOL_SYNC_SECONDS", 10))
+
+    # Tamaño de cada segmento antes de pasar al siguiente
+    SPOOL_SEGMENT_BYTES = int(os.getenv("SPOOL_SEGMENT_BYTES", 1048576))
+
+    # Ids subidos fuera de orden que se recuerdan antes de abandonar las
+    # tuplas más antiguas que la API no confirma
+    SPOOL_MAX_DROPPED = int(os.getenv("SPOOL_MAX_DROPPED", 10000))
+
+    def __init__ (self, path=None):
+        """
+        :param path: Directorio de la cola, por defecto SPOOL_PATH.
+        """
+        self.path = path or self.SPOOL_PATH
+        self.tables = {}
+        self.defaults = {}
+        self.lock = threading.RLock()
+
+    @synchronized
+    def table_set_new (self, tablename, parameters):
+        """
+        Prepara la cola de una tabla a partir de su tablemodel().
+        :param tablename: Nombre de la tabla.
+        :param parameters: Parámetros para cada columna.
+        """
+        if tablename in self.tables:
+            self.tables[tablename].close()
+
+        columns = ['id'] + list(parameters.keys())
+        datetimes = {name for name, datas in parameters.items()
+                     if datas['type'] == 'DateTime'}
+
+        # Valores por defecto calculados (created_at) al guardar.
+        self.defaults[tablename] = {
+            name: datas['others']['default']
+            for name, datas in parameters.items()
+            if datas['others'] and callable(datas['others'].get('default'))
+        }
+
+        self.tables[tablename] = SpoolTable(
+            os.path.join(self.path, tablename), columns, datetimes,
+            self.SPOOL_SEGMENT_BYTES, self.SPOOL_MAX_DROPPED)
+
+        if self.has_debug:
+            print('Cola en disco:', tablename, self.tables[tablename].path)
+
+    def table_get_columns (self, tablename):
+        """
+        Devuelve el nombre de las columnas en el orden de las tuplas.
+        :param tablename: Nombre de la tabla.
+        :return:
+        """
+        return list(self.tables[tablename].columns)
+
+    @synchronized
+    def table_get_data (self, tablename):
+        """
+        Obtiene todas las tuplas pendientes de una tabla.
+        :param tablename: Nombre de la tabla desde la que obtener datos.
+        """
+        table = self.tables[tablename]
+
+        return table.queue(table.last_id + 1)
+
+    @synchronized
+    def table_get_queue (self, tablename, limit, after_id=0):
+        """
+        Obtiene las tuplas pendientes de subir de la más antigua a la más
+        reciente a partir de un id (cursor).
+        :param tablename: Nombre de la tabla desde la que obtener datos.
+        :param limit: Límite de datos a extraer
+        :param after_id: Solo tuplas con id mayor a este.
+        """
+        return self.tables[tablename].queue(limit, after_id)
+
+    @synchronized
+    def table_save_data (self, tablename, params):
+        """
+        Añade una tupla al final de la cola de la tabla. El fsync se agrupa
+        cada SPOOL_SYNC_ROWS tuplas o SPOOL_SYNC_SECONDS segundos.
+        :param tablename: Nombre de la tabla en la que guardar.
+        :param params: Diccionario con los datos a guardar o tupla con las
+        columnas en su orden (sin id).
+        """
+        table = self.tables[tablename]
+
+        # Tupla de build_row() en el orden de las columnas de la tabla.
+        if isinstance(params, tuple):
+            row = dict(zip(table.columns[1:], params))
+        else:
+            row = dict(params)
+
+        for name, default in self.defaults[tablename].items():
+            if row.get(name) is None:
+                row[name] = default()
+
+        table.append(row)
+
+        # Sin fsync aún, pero en el sistema operativo por si cae el proceso.
+        if table.file is not None:
+            table.file.flush()
+
+        elapsed = time.monotonic() - table.synced_at
+
+        if table.unsynced >= self.SPOOL_SYNC_ROWS or \
+                (self.SPOOL_SYNC_SECONDS and elapsed >= self.SPOOL_SYNC_SECONDS):
+            table.sync()
+
+    @synchronized
+    def table_flush (self, tablename=None):
+        """
+        Fuerza a disco las tuplas pendientes de fsync.
+        :param tablename: Tabla a volcar, por defecto todas.
+        :return: Cantidad de tuplas forzadas a disco.
+        """
+        tablenames = [tablename] if tablename else list(self.tables.keys())
+        synced = 0
+
+        for name in tablenames:
+            table = self.tables[name]
+            synced += table.unsynced
+            table.sync()
+
+        return synced
+
+    @synchronized
+    def table_flush_due (self):
+        """
+        Fuerza a disco las tablas con tuplas sin fsync desde hace más de
+        SPOOL_SYNC_SECONDS, aunque no lleguen tuplas nuevas.
+        :return: Segundos hasta el próximo fsync o None si no hay ninguno
+        pendiente.
+        """
+        if not self.SPOOL_SYNC_SECONDS:
+            return None
+
+        now = time.monotonic()
+        wait = None
+
+        for table in self.tables.values():
+            if not table.unsynced:
+                continue
+
+            remaining = table.synced_at + self.SPOOL_SYNC_SECONDS - now
+
+            if remaining <= 0:
+                table.sync()
+                continue
+
+            wait = remaining if wait is None else min(wait, remaining)
+
+        return wait
+
+    @synchronized
+    def table_drop_ids (self, tablename, ids):
+        """
+        Marca como subidas las tuplas con los ids indicados.
+        :param tablename: Nombre de la tabla sobre la que actuar
+        :param ids: Lista de ids a eliminar
+        """
+        if not ids:
+            return
+
+        self.tables[tablename].drop(ids)
+
+    @synchronized
+    def table_truncate (self, tablename):
+        """
+        Descarta todas las tuplas de la tabla.
+        :param tablename: Nombre de la tabla.
+        """
+        table = self.tables[tablename]
+        table.drop(range(table.acked + 1, table.last_id + 1))
+
+    @synchronized
+    def close_connection (self):
+        print('Cerrando cola en disco')
+
+        for table in self.tables.values():
+            table.close()
@@ -0,0 +1,161 @@
+#!/usr/bin/python3
+# -*- encoding: utf-8 -*-
+
+# @author     Raúl Caro Pastorino
+# @email      dev@fryntiz.es
+# @web        https://fryntiz.es
+# @gitlab     https://gitlab.com/fryntiz
+# @github     https://github.com/fryntiz
+# @twitter    https://twitter.com/fryntiz
+# @telegram   https://t.me/fryntiz
+
+# Create Date: 2026
+# Project Name:
+# Description:
+#
+# Dependencies:
+#
+# Revision 0.01 - File Created
+# Additional Comments:
+
+# @copyright  Copyright © 2022 Raúl Caro Pastorino
+# @license    https://wwww.gnu.org/licenses/gpl.txt
+
+# Copyright (C) 2022  Raúl Caro Pastorino
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+# Guía de estilos aplicada: PEP8
+
+#######################################
+# #           Descripción           # #
+#######################################
+## Mide los bytes enviados a la API por lote con y sin compresión, usando
+## tuplas sintéticas con las columnas del modelo RenogyRoverLi.
+##
+## Uso: python3 -m benchmarks.bench_compression [--json]
+##
+
+#######################################
+# #       Importar Librerías        # #
+#######################################
+
+from Models.ApiConnection import ApiConnection
+from Models.SolarControllers.RenogyRoverLi import RenogyRoverLi
+import argparse
+import datetime
+import json
+import random
+
+#######################################
+# #            FUNCIONES            # #
+#######################################
+
+
+def make_rows (count, seed=0):
+    """
+    Genera tuplas como las devueltas por la DB con valores realistas.
+    :param count: Cantidad de tuplas a generar.
+    :param seed: Semilla para que los resultados sean reproducibles.
+    :return: Tupla (filas, columnas)
+    """
+    rnd = random.Random(seed)
+    model = RenogyRoverLi.tablemodel(None)
+    columns = ['id'] + list(model.keys())
+    start = datetime.datetime(2022, 6, 1)
+    rows = []
+
+    for n in range(count):
+        row = [n + 1]
+
+        for name, datas in model.items():
+            data_type = datas['type']
+
+            if data_type == 'Numeric':
+                value = round(rnd.uniform(0, 60), datas['params']['scale'])
+            elif data_type in ('Integer', 'BigInteger'):
+                value = rnd.randint(0, 2000)
+            elif data_type == 'Boolean':
+                value = rnd.random() > 0.5
+            elif data_type == 'DateTime':
+                value = start + datetime.timedelta(minutes=n)
+            else:
+                value = 'V{}.{}.{}'.format(rnd.randint(1, 3),
+                                           rnd.randint(0, 9),
+                                           rnd.randint(0, 9))
+
+            row.append(value)
+
+        rows.append(tuple(row))
+
+    return rows, columns
+
+
+def measure (batch_size):
+    """
+    Calcula el tamaño de un lote sin comprimir y con cada compresión.
+    :param batch_size: Tuplas por lote.
+    :return: Diccionario con los bytes de cada variante.
+    """
+    api = ApiConnection()
+    api.API_BATCH_ROWS = batch_size
+    api.API_BATCH_BYTES = 1 << 30
+    api.API_COMPRESSION_MIN_BYTES = 0
+
+    rows, columns = make_rows(batch_size)
+    _, batch_json = next(api.build_batches(rows, columns))
+
+    result = {'rows': batch_size}
+
+    for compression in ('none', 'gzip', 'zstd'):
+        api.API_COMPRESSION = compression
+        body, encoding = api.compress_body(batch_json)
+
+        # Sin zstandard instalado se cae a gzip, no lo cuento dos veces.
+        if compression == 'zstd' and encoding != 'zstd':
+            continue
+
+        result[compression] = len(body)
+
+    return result
+
+
+def main ():
+    parser = argparse.ArgumentParser(
+        description='Bytes en la red por lote enviado a la API')
+    parser.add_argument('--json', action='store_true',
+                        help='Salida en JSON para comparar resultados')
+    args = parser.parse_args()
+
+    results = [measure(size) for size in (1, 20, 100, 500)]
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+        return
+
+    for result in results:
+        line = '{:>4} tuplas: {:>8} bytes'.format(result['rows'],
+                                                  result['none'])
+
+        for compression in ('gzip', 'zstd'):
+            if compression in result:
+                line += ', {} {:>7} ({:.1%})'.format(
+                    compression, result[compression],
+                    1 - result[compression] / result['none'])
+
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/python3
+# -*- encoding: utf-8 -*-
+
+# @author     Raúl Caro Pastorino
+# @email      dev@fryntiz.es
+# @web        https://fryntiz.es
+# @gitlab     https://gitlab.com/fryntiz
+# @github     https://github.com/fryntiz
+# @twitter    https://twitter.com/fryntiz
+# @telegram   https://t.me/fryntiz
+
+# Create Date: 2026
+# Project Name:
+# Description:
+#
+# Dependencies:
+#
+# Revision 0.01 - File Created
+# Additional Comments:
+
+# @copyright  Copyright © 2022 Raúl Caro Pastorino
+# @license    https://wwww.gnu.org/licenses/gpl.txt
+
+# Copyright (C) 2022  Raúl Caro Pastorino
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+# Guía de estilos aplicada: PEP8
+
+#######################################
+# #           Descripción           # #
+#######################################
+## Compara el tiempo de decodificar el bloque de registros 0x0100-0x0121 del
+## modelo RenogyRoverLi campo a campo frente al unpack struct precompilado.
+## Los resultados de ambos caminos se comprueban en
+## tests/test_register_decoding.py, aquí solo se mide el tiempo.
+##
+## Uso: python3 -m benchmarks.bench_decoding [--json] [--number N]
+##
+
+#######################################
+# #       Importar Librerías        # #
+#######################################
+
+from Models.SolarControllers.AbstractModel import RegisterBlockDecoder
+from Models.SolarControllers.RenogyRoverLi import RenogyRoverLi
+import argparse
+import json
+import random
+import timeit
+
+#######################################
+# #             Variables           # #
+#######################################
+
+# Bloque de datos en tiempo real e históricos del controlador
+BLOCK_START = 0x0100
+BLOCK_COUNT = 0x22
+
+#######################################
+# #            FUNCIONES            # #
+#######################################
+
+
+def make_registers (seed=0):
+    """
+    Genera un volcado sintético del bloque con valores de 16 bits.
+    :param seed: Semilla para que los resultados sean reproducibles.
+    :return: Lista con los registros del bloque.
+    """
+    rnd = random.Random(seed)
+
+    return [rnd.randint(0, 0xffff) for _ in range(BLOCK_COUNT)]
+
+
+def measure (number):
+    """
+    Mide ambos caminos de decodificación sobre el mismo volcado.
+    :param number: Repeticiones de cada decodificación.
+    :return: Diccionario con microsegundos por bloque de cada camino.
+    """
+    model = RenogyRoverLi(serial=object())
+    words = make_registers()
+    registers = dict(enumerate(words, BLOCK_START))
+    block = RegisterBlockDecoder(model, BLOCK_START, BLOCK_COUNT)
+
+    # Solo los campos del bloque, para comparar el mismo trabajo.
+    names = set(block.names) | {name for name, *_ in block.fallback}
+
+    fields = timeit.timeit(lambda: model.decode_registers(registers, names),
+                           number=number)
+    packed = timeit.timeit(lambda: block.decode_words(words), number=number)
+
+    return {
+        'fields': len(names),
+        'number': number,
+        'per_field_us': fields / number * 1e6,
+        'struct_us': packed / number * 1e6,
+        'speedup': fields / packed,
+    }
+
+
+def main ():
+    parser = argparse.ArgumentParser(
+        description='Decodificación de un bloque de registros')
+    parser.add_argument('--json', action='store_true',
+                        help='Salida en JSON para comparar resultados')
+    parser.add_argument('--number', type=int, default=20000,
+                        help='Repeticiones de cada decodificación')
+    args = parser.parse_args()
+
+    result = measure(args.number)
+
+    if args.json:
+        print(json.dumps(result, indent=4))
+        return
+
+    print('{} campos, {} repeticiones'.format(result['fields'],
+                                             result['number']))
+    print('Campo a campo: {:>8.2f} us/bloque'.format(result['per_field_us']))
+    print('struct:        {:>8.2f} us/bloque'.format(result['struct_us']))
+    print('Mejora:        {:>8.2f}x'.format(result['speedup']))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+#!/usr/bin/python3
+# -*- encoding: utf-8 -*-
+
+# @author     Raúl Caro Pastorino
+# @email      dev@fryntiz.es
+# @web        https://fryntiz.es
+# @gitlab     https://gitlab.com/fryntiz
+# @github     https://github.com/fryntiz
+# @twitter    https://twitter.com/fryntiz
+# @telegram   https://t.me/fryntiz
+
+# Create Date: 2026
+# Project Name:
+# Description:
+#
+# Dependencies:
+#
+# Revision 0.01 - File Created
+# Additional Comments:
+
+# @copyright  Copyright © 2022 Raúl Caro Pastorino
+# @license    https://wwww.gnu.org/licenses/gpl.txt
+
+# Copyright (C) 2022  Raúl Caro Pastorino
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+# Guía de estilos aplicada: PEP8
+
+#######################################
+# #           Descripción           # #
+#######################################
+## Mide el arranque de la aplicación con la base de datos inalcanzable: lo
+## que tarda en importarse main.py y en tomarse la primera lectura (con el
+## controlador simulado) pasando por main.main() igual que en producción.
+## Ninguno de los dos debe esperar a la DB ni a la red.
+##
+## Sale con código 1 si la primera lectura supera --target segundos.
+##
+## Uso: python3 -m benchmarks.bench_startup [--json] [--target 5]
+##
+## Un .env en el proyecto tiene prioridad sobre las variables que se fijan
+## aquí, ya que main.py lo carga sobreescribiendo.
+##
+
+#######################################
+# #       Importar Librerías        # #
+#######################################
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+#######################################
+# #             Variables           # #
+#######################################
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Se ejecuta en un proceso nuevo para medir también las importaciones.
+CHILD = '''
+import os
+import threading
+import time
+started = time.monotonic()
+import main
+imported = time.monotonic()
+
+# Arranque real: pausa inicial, planificador y hilos de main.loop().
+threading.Thread(target=main.main, daemon=True).start()
+
+if main.first_reading.wait(60):
+    print('RESULT', imported - started, time.monotonic() - started,
+          flush=True)
+
+# Sin esperar a los hilos que siguen intentando conectar con la DB.
+os._exit(0)
+'''
+
+# Base de datos en una IP que no responde y la API desactivada
+ENVIRONMENT = {
+    'PORT': 'sim:seed=1',
+    'DEVICE_ID': '1',
+    'CONTROLLERS_CONFIG': '',
+    'STORAGE': 'db',
+    'DB_CONNECTION': 'postgresql',
+    'DB_HOST': '10.255.255.1',
+    'DB_PORT': '5432',
+    'DB_DATABASE': 'solar_controller',
+    'DB_USERNAME': 'dbuser',
+    'DB_PASSWORD': 'dbpassword',
+    'UPLOAD_API': 'False',
+    'POLL_PERIOD': '60',
+    'POLL_ALIGN': 'True',
+    'POLL_IMMEDIATE': 'True',
+    'DEBUG': 'False',
+}
+
+#######################################
+# #            FUNCIONES            # #
+#######################################
+
+
+def measure (timeout):
+    """
+    Arranca la aplicación en otro proceso y espera a la primera lectura.
+    :param timeout: Segundos máximos a esperar.
+    :return: Diccionario con los tiempos en segundos, process_s incluye
+    arrancar el intérprete.
+    """
+    env = dict(os.environ)
+    env.update(ENVIRONMENT)
+
+    start = time.monotonic()
+    process = subprocess.Popen([sys.executable, '-c', CHILD], cwd=ROOT,
+                               env=env, stdout=subprocess.PIPE, text=True)
+
+    try:
+        output, _ = process.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.communicate()
+
+        return {'first_reading_s': None}
+
+    elapsed = time.monotonic() - start
+
+    for line in output.splitlines():
+        if line.startswith('RESULT'):
+            _, imported, first = line.split()
+
+            return {
+                'import_s': float(imported),
+                'first_reading_s': float(first),
+                'process_s': elapsed,
+            }
+
+    return {'first_reading_s': None}
+
+
+def main ():
+    parser = argparse.ArgumentParser(
+        description='Tiempo de arranque hasta la primera lectura')
+    parser.add_argument('--json', action='store_true',
+                        help='Salida en JSON para comparar resultados')
+    parser.add_argument('--target', type=float, default=5.0,
+                        help='Segundos máximos hasta la primera lectura')
+    args = parser.parse_args()
+
+    result = measure(args.target * 4)
+
+    if args.json:
+        print(json.dumps(result, indent=4))
+    else:
+        for name, value in result.items():
+            print('{:<26} {}'.format(name, value))
+
+    if result['first_reading_s'] is None or \
+            result['process_s'] > args.target:
+        print('Primera lectura por encima de', args.target, 's',
+              file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
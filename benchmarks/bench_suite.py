@@ -0,0 +1,369 @@
+#!/usr/bin/python3
+# -*- encoding: utf-8 -*-
+
+# @author     Raúl Caro Pastorino
+# @email      dev@fryntiz.es
+# @web        https://fryntiz.es
+# @gitlab     https://gitlab.com/fryntiz
+# @github     https://github.com/fryntiz
+# @twitter    https://twitter.com/fryntiz
+# @telegram   https://t.me/fryntiz
+
+# Create Date: 2026
+# Project Name:
+# Description:
+#
+# Dependencies:
+#
+# Revision 0.01 - File Created
+# Additional Comments:
+
+# @copyright  Copyright © 2022 Raúl Caro Pastorino
+# @license    https://wwww.gnu.org/licenses/gpl.txt
+
+# Copyright (C) 2022  Raúl Caro Pastorino
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+# Guía de estilos aplicada: PEP8
+
+#######################################
+# #           Descripción           # #
+#######################################
+## Mide el ciclo completo de la aplicación sin hardware ni servidores:
+##
+## - poll: RenogyRoverLi.get_all_datas() contra el controlador simulado.
+## - rtt: Ida y vuelta de una lectura de registro en SerialConnection.
+## - db: DbConnection.table_save_data() sobre un SQLite temporal.
+## - spool: SpoolConnection.table_save_data() sobre un directorio temporal.
+## - upload: ApiConnection.upload() y upload_bulk() contra un servidor HTTP
+##   local que responde 201.
+##
+## Con --json la salida puede guardarse y pasarse después en --baseline para
+## fallar (código 1) si alguna métrica empeora más de --tolerance.
+##
+## Uso: python3 -m benchmarks.bench_suite [--json] [--baseline archivo]
+##
+## El guardado en la DB se mide sobre un motor SQLite temporal creado aquí
+## y asignado a DbConnection, sin depender del DB_CONNECTION configurado.
+##
+
+#######################################
+# #       Importar Librerías        # #
+#######################################
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+#######################################
+# #             Variables           # #
+#######################################
+
+# Métricas en las que un valor mayor es peor (el resto son tasas).
+LOWER_IS_BETTER = ('_ms', '_per_cycle')
+
+#######################################
+# #            FUNCIONES            # #
+#######################################
+
+
+def summarize (samples, prefix):
+    """
+    Resume una lista de tiempos en segundos.
+    :param samples: Tiempos medidos.
+    :param prefix: Prefijo para el nombre de cada métrica.
+    :return: Diccionario con media, mediana y percentil 95 en ms.
+    """
+    samples = sorted(samples)
+
+    return {
+        prefix + '_mean_ms': statistics.mean(samples) * 1000,
+        prefix + '_p50_ms': statistics.median(samples) * 1000,
+        prefix + '_p95_ms': samples[math.ceil(len(samples) * 0.95) - 1] * 1000,
+    }
+
+
+def measure_poll (cycles, port):
+    """
+    Mide ciclos completos de lectura del controlador simulado.
+    :param cycles: Ciclos a medir.
+    :param port: Puerto "sim:..." con latencia y errores.
+    :return:
+    """
+    from Models.ControllerRegistry import ControllerRegistry
+
+    registry = ControllerRegistry(poll_budget=20)
+    controller = registry.add('RenogyRoverLi', port)
+    client = controller.serial.client
+    samples = []
+
+    for _ in range(cycles):
+        start = time.perf_counter()
+        controller.get_all_datas()
+        samples.append(time.perf_counter() - start)
+
+    registry.close()
+
+    result = summarize(samples, 'poll')
+    result['poll_requests_per_cycle'] = client.requests / cycles
+
+    return result
+
+
+def measure_rtt (reads, port):
+    """
+    Mide lecturas individuales de un registro.
+    :param reads: Lecturas a medir.
+    :param port: Puerto "sim:..." con latencia y errores.
+    :return:
+    """
+    from Models.SerialConnection import SerialConnection
+
+    serial = SerialConnection(port=port, debug=False, persistent=True)
+    samples = []
+
+    for _ in range(reads):
+        start = time.perf_counter()
+        serial.read_register(0x0101, 1)
+        samples.append(time.perf_counter() - start)
+
+    serial.close()
+
+    return summarize(samples, 'rtt')
+
+
+def measure_db (rows, buffer_rows, directory):
+    """
+    Mide guardados en la DB con el modelo RenogyRoverLi.
+    :param rows: Tuplas a guardar.
+    :param buffer_rows: Valor de DB_BUFFER_ROWS.
+    :param directory: Directorio temporal para el archivo SQLite.
+    :return:
+    """
+    from Models.DbConnection import DbConnection
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+    from Models.SolarControllers.RenogyRoverLi import RenogyRoverLi
+    from benchmarks.bench_compression import make_rows
+
+    model = RenogyRoverLi(serial=object())
+    tablename = model.tablename
+    sample_rows, _ = make_rows(rows)
+    # Tuplas en el orden de columnas como las de build_row().
+    params = [tuple(row[1:]) for row in sample_rows]
+
+    # Motor propio para no abrir la base de datos configurada en .env.
+    db = DbConnection()
+    db.engine = create_engine(
+        'sqlite:///' + os.path.join(directory, 'bench.sqlite3'),
+        connect_args={'check_same_thread': False})
+    db.Session = sessionmaker(bind=db.engine)
+    db.DB_BUFFER_ROWS = buffer_rows
+
+    # table_save_data() informa de cada tupla por consola.
+    with contextlib.redirect_stdout(io.StringIO()):
+        db.table_set_new(tablename, model.tablemodel())
+        db.table_truncate(tablename)
+
+        start = time.perf_counter()
+
+        for param in params:
+            db.table_save_data(tablename, param)
+
+        db.table_flush(tablename)
+        elapsed = time.perf_counter() - start
+
+        stored = len(db.table_get_data(tablename))
+
+    assert stored == rows, (stored, rows)
+
+    return {'db_rows_per_s': rows / elapsed}
+
+
+def measure_spool (rows, directory):
+    """
+    Mide guardados en la cola en disco con el modelo RenogyRoverLi.
+    :param rows: Tuplas a guardar.
+    :param directory: Directorio temporal para los segmentos.
+    :return:
+    """
+    from Models.SpoolConnection import SpoolConnection
+    from Models.SolarControllers.RenogyRoverLi import RenogyRoverLi
+    from benchmarks.bench_compression import make_rows
+
+    model = RenogyRoverLi(serial=object())
+    tablename = model.tablename
+    sample_rows, _ = make_rows(rows)
+    # Tuplas en el orden de columnas como las de build_row().
+    params = [tuple(row[1:]) for row in sample_rows]
+
+    spool = SpoolConnection(os.path.join(directory, 'spool'))
+    spool.table_set_new(tablename, model.tablemodel())
+
+    start = time.perf_counter()
+
+    for param in params:
+        spool.table_save_data(tablename, param)
+
+    spool.table_flush(tablename)
+    elapsed = time.perf_counter() - start
+
+    stored = len(spool.table_get_data(tablename))
+    spool.tables[tablename].close()
+
+    assert stored == rows, (stored, rows)
+
+    return {'spool_rows_per_s': rows / elapsed}
+
+
+class StubApiHandler(BaseHTTPRequestHandler):
+    """
+    API local que confirma todo lo recibido con 201.
+    """
+
+    def do_POST (self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.send_response(201)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message (self, *args):
+        pass
+
+
+def measure_upload (rows):
+    """
+    Mide la subida a una API local fila a fila y en lotes.
+    :param rows: Tuplas a subir.
+    :return:
+    """
+    from Models.ApiConnection import ApiConnection
+    from benchmarks.bench_compression import make_rows
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubApiHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    api = ApiConnection()
+    api.API_URL = 'http://127.0.0.1:{}'.format(server.server_port)
+    api.DEBUG = False
+
+    datas, columns = make_rows(rows)
+    result = {}
+
+    try:
+        for name, upload in (('upload', api.upload),
+                             ('upload_bulk', api.upload_bulk)):
+            start = time.perf_counter()
+            acknowledged = upload('bench', '/bench', datas, columns)
+            elapsed = time.perf_counter() - start
+
+            assert len(acknowledged) == rows, (name, len(acknowledged))
+
+            result[name + '_rows_per_s'] = rows / elapsed
+    finally:
+        api.close_session()
+        server.shutdown()
+
+    return result
+
+
+def compare (results, baseline, tolerance):
+    """
+    Compara los resultados con otros anteriores.
+    :param results: Métricas actuales.
+    :param baseline: Métricas de referencia.
+    :param tolerance: Empeoramiento relativo permitido (0.2 → 20%).
+    :return: Lista de textos con las métricas que han empeorado.
+    """
+    regressions = []
+
+    for name, reference in baseline.items():
+        value = results.get(name)
+
+        if value is None or not reference:
+            continue
+
+        if name.endswith(LOWER_IS_BETTER):
+            change = value / reference - 1
+        else:
+            change = reference / value - 1
+
+        if change > tolerance:
+            regressions.append('{}: {:.3f} → {:.3f} ({:+.0%})'.format(
+                name, reference, value, change))
+
+    return regressions
+
+
+def main ():
+    parser = argparse.ArgumentParser(
+        description='Rendimiento del ciclo de lectura, guardado y subida')
+    parser.add_argument('--json', action='store_true',
+                        help='Salida en JSON para comparar resultados')
+    parser.add_argument('--port', default='sim:seed=1',
+                        help='Puerto simulado (ej: sim:latency=0.02,crc=0.01)')
+    parser.add_argument('--cycles', type=int, default=20,
+                        help='Ciclos de lectura a medir')
+    parser.add_argument('--reads', type=int, default=100,
+                        help='Lecturas de un registro a medir')
+    parser.add_argument('--rows', type=int, default=500,
+                        help='Tuplas a guardar y subir')
+    parser.add_argument('--buffer-rows', type=int, default=50,
+                        help='DB_BUFFER_ROWS para el guardado')
+    parser.add_argument('--baseline',
+                        help='JSON de una ejecución anterior para comparar')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='Empeoramiento permitido respecto a baseline')
+    args = parser.parse_args()
+
+    results = {}
+
+    with tempfile.TemporaryDirectory() as directory:
+        results.update(measure_poll(args.cycles, args.port))
+        results.update(measure_rtt(args.reads, args.port))
+        results.update(measure_db(args.rows, args.buffer_rows, directory))
+        results.update(measure_spool(args.rows, directory))
+        results.update(measure_upload(args.rows))
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+    else:
+        for name, value in results.items():
+            print('{:<28} {:>12.3f}'.format(name, value))
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+
+        for regression in regressions:
+            print('Empeora', regression, file=sys.stderr)
+
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -53,12 +53,18 @@
 #######################################
 # #       Importar Librerías        # #
 #######################################
-from Models.SolarControllers.RenogyRoverLi import RenogyRoverLi
+from Models.ControllerRegistry import ControllerRegistry
 from Models.ApiConnection import ApiConnection
+from Models.AsyncApiConnection import AsyncApiConnection
 from Models.DbConnection import DbConnection
+from Models.SpoolConnection import SpoolConnection
+from Models.PollScheduler import PollScheduler
+from Models.Pipeline import Pipeline
 from dotenv import load_dotenv
 import os
+import asyncio
 import datetime
+import threading
 import time
 
 # Cargo archivos de configuración desde .env sobreescribiendo variables locales.
@@ -70,6 +76,10 @@ load_dotenv(override=True)
 
 sleep = time.sleep
 
+# Momento de arranque para medir cuánto tarda la primera lectura.
+STARTED_AT = time.monotonic()
+first_reading = threading.Event()
+
 # Debug
 DEBUG = os.getenv("DEBUG") == "True"
 
@@ -79,18 +89,55 @@ PORT = os.getenv("PORT")
 # Indica si procesa subidas a la api
 UPLOAD_API = os.getenv("UPLOAD_API") == "True"
 
-# Abro conexión con la base de datos instanciando el modelo que la representa.
-dbconnection = DbConnection()
+# Ruta de la api que acepta lotes de tuplas, si no existe se sube una a una
+API_BULK_PATH = os.getenv("API_BULK_PATH")
+
+# Sube con asyncio manteniendo varias peticiones en vuelo (requiere aiohttp)
+API_ASYNC = os.getenv("API_ASYNC") == "True"
+
+# Segundos entre lecturas, alineadas con el reloj (minuto en punto con 60)
+POLL_PERIOD = float(os.getenv("POLL_PERIOD", 60))
+POLL_ALIGN = os.getenv("POLL_ALIGN", "True") == "True"
+
+# Toma la primera lectura al arrancar sin esperar a la primera marca alineada
+POLL_IMMEDIATE = os.getenv("POLL_IMMEDIATE", "True") == "True"
+
+# Lecturas en espera de guardarse y segundos máximos entre subidas
+STORAGE_QUEUE_SIZE = int(os.getenv("STORAGE_QUEUE_SIZE", 100))
+UPLOAD_INTERVAL = float(os.getenv("UPLOAD_INTERVAL", 60))
+
+# Mantiene abierto el puerto serial entre ciclos de lectura
+SERIAL_PERSISTENT = os.getenv("SERIAL_PERSISTENT", "True") == "True"
+
+# Archivo donde grabar una traza de las lecturas para reproducirla con un
+# puerto "sim:replay=archivo"
+SERIAL_RECORD = os.getenv("SERIAL_RECORD")
+
+# Segundos máximos por ciclo de lectura, al agotarse se guardan datos parciales
+POLL_BUDGET = float(os.getenv("POLL_BUDGET", 20))
+
+# Almacenamiento local de lecturas: base de datos (db) o cola en archivos
+# de solo escritura al final (spool)
+STORAGE = os.getenv("STORAGE", "db")
+
+# La conexión con la base de datos y la API se abren al primer uso, las
+# lecturas comienzan aunque aún no estén disponibles.
+dbconnection = SpoolConnection() if STORAGE == 'spool' else DbConnection()
 
 # Parámetros para acceder a la API.
-apiconnection = ApiConnection()
+apiconnection = AsyncApiConnection() if API_ASYNC else ApiConnection()
 
-# Controlador solar
-device_id = int(os.getenv("DEVICE_ID")) or 0
-solar_controller = RenogyRoverLi(device_id=device_id, port=PORT, debug=DEBUG)
+# Controladores solares, desde CONTROLLERS_CONFIG o el único de DEVICE_ID/PORT
+CONTROLLERS_CONFIG = os.getenv("CONTROLLERS_CONFIG")
 
-# Controladores
-#controllers = {}
+controllers = ControllerRegistry(debug=DEBUG, persistent=SERIAL_PERSISTENT,
+                                 poll_budget=POLL_BUDGET, record=SERIAL_RECORD)
+
+if CONTROLLERS_CONFIG:
+    controllers.load_file(CONTROLLERS_CONFIG)
+else:
+    device_id = int(os.getenv("DEVICE_ID")) or 0
+    controllers.add('RenogyRoverLi', PORT, unit=1, device_id=device_id)
 
 #######################################
 # #            FUNCIONES            # #
@@ -99,113 +146,206 @@ solar_controller = RenogyRoverLi(device_id=device_id, port=PORT, debug=DEBUG)
 
 def upload_data_to_api(apiconnection, dbconnection):
     """
-    Obtiene los datos para de la DB y los envía a la API
+    Sube a la API los datos pendientes de todas las tablas de controladores.
     :param apiconnection:
     :param dbconnection:
     """
+    for tablename in controllers.tables():
+        upload_table_to_api(apiconnection, dbconnection, tablename)
 
-    # Parámetros/tuplas desde la base de datos.
-    params_from_db = dbconnection.table_get_data_last(
-        solar_controller.tablename, 20)
+
+def upload_table_to_api(apiconnection, dbconnection, tablename):
+    """
+    Obtiene los datos de la DB, de los más antiguos a los más recientes, y
+    los envía a la API eliminando solo las tuplas que esta ha confirmado.
+    :param apiconnection:
+    :param dbconnection:
+    :param tablename: Tabla de la que subir los datos.
+    """
 
     # Columnas del modelo.
-    columns = dbconnection.tables[solar_controller.tablename].columns.keys()
+    columns = dbconnection.table_get_columns(tablename)
 
-    try:
-        response = apiconnection.upload(
-            solar_controller.tablename,
-            '/hardware/v1/solarcharge/store',
-            params_from_db,
-            columns,
-            method='POST'
-        )
-
-        # Limpio los datos de la tabla si se ha subido correctamente.
-        if response:
+    # Tuplas por petición (lote) o por tanda en la subida de una en una.
+    limit = apiconnection.API_BATCH_ROWS if API_BULK_PATH else 20
+
+    # En asíncrono cada tanda se reparte entre varias peticiones en vuelo.
+    if API_ASYNC:
+        limit *= apiconnection.API_CONCURRENCY
+
+    # Último id procesado, las tuplas fallidas se reintentan en otra subida.
+    cursor = 0
+
+    while True:
+        # Parámetros/tuplas desde la base de datos.
+        params_from_db = dbconnection.table_get_queue(tablename, limit,
+                                                      cursor)
+
+        if not params_from_db:
+            break
+
+        cursor = params_from_db[-1].id
+
+        if API_BULK_PATH:
+            acknowledged = apiconnection.upload_bulk(
+                tablename,
+                API_BULK_PATH,
+                params_from_db,
+                columns,
+                method='POST'
+            )
+        else:
+            acknowledged = apiconnection.upload(
+                tablename,
+                '/hardware/v1/solarcharge/store',
+                params_from_db,
+                columns,
+                method='POST'
+            )
+
+        # El cliente asíncrono devuelve una corrutina, la ejecuto aquí.
+        if asyncio.iscoroutine(acknowledged):
+            acknowledged = asyncio.run(acknowledged)
+
+        # Si la API no acepta nada se deja la cola para la próxima subida.
+        if not acknowledged:
             if DEBUG:
-                print('Eliminando de la DB las tuplas subidas a la API')
+                print('La API no ha confirmado ninguna tupla')
+
+            break
 
-            dbconnection.table_drop_last_elements(solar_controller.tablename, 20)
-    except():
         if DEBUG:
-            print('Error al subir a la api')
+            print('Eliminando de la DB las tuplas confirmadas por la API:',
+                  len(acknowledged))
 
+        dbconnection.table_drop_ids(tablename,
+                                    [row.id for row in acknowledged])
 
-def loop ():
-    # Contador de lecturas desde la última subida a la API
-    n_lecturas = 0
+
+def read_controller (solar_controller, tick, pipeline):
+    """
+    Realiza una lectura completa de un controlador y la entrega a la etapa
+    de guardado.
+    :param solar_controller: Controlador a leer.
+    :param tick: Momento (epoch) de la marca del planificador.
+    :param pipeline: Etapas de guardado y subida.
+    """
+    # Guardo el momento que inicia lectura.
+    marca_inicio = datetime.datetime.now(tz=None)
+
+    # Leyendo controlador solar (incluye info e históricos del ciclo)
+    params = solar_controller.get_all_datas()
+
+    # Aviso de campos que no se han podido leer en este ciclo.
+    status = solar_controller.get_poll_status()
+
+    if status['stale'] or status['missing']:
+        print('Lectura incompleta en ' + solar_controller.tablename + ': ' +
+              str(status))
 
     if DEBUG:
-        print('Creando tabla en la base de datos')
-    # Crea la tabla para el controlador solar.
-    dbconnection.table_set_new(solar_controller.tablename, solar_controller.tablemodel())
+        print('Datos obtenidos: ' + str(params))
+        print("\n")
 
-    while True:
-        n_lecturas = n_lecturas + 1
+    # Tupla con solo las columnas de tablemodel() en su orden. La fecha se
+    # alinea con la marca del planificador, no con el fin de la lectura,
+    # para poder cruzar datos con otros sensores.
+    row = solar_controller.build_row(
+        params, created_at=datetime.datetime.utcfromtimestamp(tick))
 
-        if DEBUG:
-            print('Lecturas desde la última subida: ' + str(
-                n_lecturas))
+    # Entrego la lectura a la etapa de guardado (no bloquea).
+    pipeline.submit(solar_controller.tablename, row)
 
-        # Guardo el momento que inicia lectura.
-        marca_inicio = datetime.datetime.now(tz=None)
+    if not first_reading.is_set():
+        first_reading.set()
+        print('Primera lectura a los {:.2f} s del arranque'.format(
+            time.monotonic() - STARTED_AT))
 
-        # Leyendo controlador solar
-        datas = solar_controller.get_all_datas()
-        info = solar_controller.get_all_controller_info_datas()
-        historical_today = solar_controller.get_today_historical_info_datas()
-        historical = solar_controller.get_historical_info_datas()
-        params = {**datas, **info, **historical_today, **historical}
+    # Muestro tiempo en realizarse la lectura de datos.
+    if DEBUG:
+        print('Inicio: ', str(marca_inicio))
+    marca_fin = datetime.datetime.now(tz=None)
 
-        if DEBUG:
-            print('Datos obtenidos: ' + str(datas))
-            print('Información del controlador: ' + str(info))
-            print('Histórico del día: ' + str(historical_today))
-            print('Histórico total: ' + str(historical))
-            print("\n")
-            print('Parámetros a guardar: ' + str(params))
+    if DEBUG:
+        print('Fin: ', str(marca_fin))
 
+    tiempo_ejecucion = marca_fin - marca_inicio
 
-        # TODO → Quitar de parámetros los que no estén en tablemodel()
-        data_to_save = {}
+    if DEBUG:
+        print('Tiempo de ejecución: ', str(tiempo_ejecucion))
 
-        for key in solar_controller.tablemodel():
-            if key in params:
-                data_to_save[key] = params[key]
 
-        # Almacena en la base de datos.
-        dbconnection.table_save_data(
-            tablename=solar_controller.tablename,
-            params=data_to_save
-        )
+def poll_port (port, port_controllers, pipeline):
+    """
+    Bucle de lectura para un puerto serial. Los puertos se leen en paralelo
+    y los dispositivos de un mismo bus uno detrás de otro.
+    :param port: Puerto serial.
+    :param port_controllers: Controladores conectados a ese puerto.
+    :param pipeline: Etapas de guardado y subida.
+    """
+    # Marca las lecturas en intervalos fijos sin acumular retrasos.
+    scheduler = PollScheduler(period=POLL_PERIOD, align=POLL_ALIGN,
+                              debug=DEBUG, immediate=POLL_IMMEDIATE)
 
-        if n_lecturas == 1:
-            n_lecturas = 0
+    while True:
+        # Espero a la próxima marca, se usa como fecha de la lectura.
+        tick = scheduler.wait()
 
+        for solar_controller in port_controllers:
             try:
-                if UPLOAD_API:
-                    upload_data_to_api(apiconnection, dbconnection)
-            except():
-                if DEBUG:
-                    print('Error al subir datos a la api')
+                read_controller(solar_controller, tick, pipeline)
+            except Exception as e:
+                print('Error al leer el controlador', port,
+                      solar_controller.unit, e.__class__.__name__)
+                print(e)
 
-        # Muestro tiempo en realizarse la lectura de datos.
-        if DEBUG:
-            print('Inicio: ', str(marca_inicio))
-        marca_fin = datetime.datetime.now(tz=None)
 
-        if DEBUG:
-            print('Fin: ', str(marca_fin))
+def create_tables ():
+    """
+    Crea una tabla por cada modelo de controlador solar.
+    """
+    if DEBUG:
+        print('Creando tabla en la base de datos')
 
-        tiempo_ejecucion = marca_fin - marca_inicio
+    for tablename, solar_controller in controllers.tables().items():
+        dbconnection.table_set_new(tablename, solar_controller.tablemodel())
 
-        if DEBUG:
-            print('Tiempo de ejecución: ', str(tiempo_ejecucion))
 
-        # Pausa entre cada lectura
-        sleep(60)
+def loop ():
+    # Guardado y subida corren en sus propios hilos para que la red nunca
+    # retrase la siguiente lectura. Las tablas se crean desde el hilo de
+    # guardado para no esperar a la DB antes de la primera lectura.
+    pipeline = Pipeline(
+        dbconnection,
+        upload=(lambda: upload_data_to_api(apiconnection, dbconnection))
+        if UPLOAD_API else None,
+        queue_size=STORAGE_QUEUE_SIZE,
+        upload_interval=UPLOAD_INTERVAL,
+        debug=DEBUG,
+        setup=create_tables
+    )
+    pipeline.start()
+
+    # Un hilo de lectura por cada puerto serial.
+    pollers = [
+        threading.Thread(target=poll_port, name='poll ' + port,
+                         args=(port, port_controllers, pipeline), daemon=True)
+        for port, port_controllers in controllers.ports.items()
+    ]
+
+    for poller in pollers:
+        poller.start()
+
+    try:
+        while any(poller.is_alive() for poller in pollers):
+            for poller in pollers:
+                poller.join(1)
+    finally:
+        # Guardo lo pendiente en la cola antes de salir o reiniciar.
+        pipeline.stop()
 
     # Acciones tras terminar con error
+    controllers.close()
     dbconnection.close_connection()
 
 
@@ -217,9 +357,13 @@ def main ():
 
     try:
         loop()
+    except KeyboardInterrupt:
+        # Guardo las lecturas pendientes en el buffer antes de salir.
+        dbconnection.close_connection()
     except Exception as e:
         print('Ha ocurrido un error en la aplicación:', e.__class__.__name__)
         print(e)
+        dbconnection.table_flush()
         sleep(300)
         main()
     exit(0)
@@ -0,0 +1,184 @@
+#!/usr/bin/python3
+# -*- encoding: utf-8 -*-
+
+# @author     Raúl Caro Pastorino
+# @email      dev@fryntiz.es
+# @web        https://fryntiz.es
+# @gitlab     https://gitlab.com/fryntiz
+# @github     https://github.com/fryntiz
+# @twitter    https://twitter.com/fryntiz
+# @telegram   https://t.me/fryntiz
+
+# Create Date: 2026
+# Project Name:
+# Description:
+#
+# Dependencies:
+#
+# Revision 0.01 - File Created
+# Additional Comments:
+
+# @copyright  Copyright © 2022 Raúl Caro Pastorino
+# @license    https://wwww.gnu.org/licenses/gpl.txt
+
+# Copyright (C) 2022  Raúl Caro Pastorino
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+# Guía de estilos aplicada: PEP8
+
+#######################################
+# #           Descripción           # #
+#######################################
+## Pruebas de AsyncApiConnection contra una API local: orden de los
+## resultados, confirmaciones parciales y límite de peticiones en vuelo.
+##
+## Uso: python3 -m unittest tests.test_async_api_connection
+##
+
+#######################################
+# #       Importar Librerías        # #
+#######################################
+
+from Models.AsyncApiConnection import AsyncApiConnection, aiohttp
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import asyncio
+import collections
+import json
+import threading
+import time
+import unittest
+
+#######################################
+# #             Variables           # #
+#######################################
+
+# Tuplas con el id y una copia en seq, ya que el id no se envía a la API.
+Row = collections.namedtuple('Row', ['id', 'seq'])
+COLUMNS = ['id', 'seq']
+
+#######################################
+# #            FUNCIONES            # #
+#######################################
+
+
+class StubApiHandler(BaseHTTPRequestHandler):
+    """
+    API local que cuenta las peticiones en vuelo y responde más tarde a las
+    primeras para que terminen fuera de orden. Confirma solo las tuplas con
+    seq par: con 201/422 en las individuales y con un array 200 en lotes.
+    """
+
+    def do_POST (self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        rows = body if isinstance(body, list) else [body]
+        seqs = [int(row['seq']) for row in rows]
+
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight,
+                                       server.in_flight)
+
+        time.sleep(0.01 * (4 - seqs[0] % 4))
+
+        with server.lock:
+            server.in_flight -= 1
+            server.completed.append(seqs[0])
+
+        if isinstance(body, list):
+            status = 200
+            response = json.dumps([{'success': seq % 2 == 0}
+                                   for seq in seqs])
+        else:
+            status = 201 if seqs[0] % 2 == 0 else 422
+            response = '{}'
+
+        payload = response.encode('utf-8')
+
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message (self, *args):
+        pass
+
+
+@unittest.skipIf(aiohttp is None, 'Es necesario aiohttp')
+class AsyncApiConnectionTest(unittest.TestCase):
+
+    def setUp (self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), StubApiHandler)
+        self.server.lock = threading.Lock()
+        self.server.in_flight = 0
+        self.server.max_in_flight = 0
+        self.server.completed = []
+
+        threading.Thread(target=self.server.serve_forever,
+                         daemon=True).start()
+
+        self.api = AsyncApiConnection()
+        self.api.API_URL = 'http://127.0.0.1:{}'.format(
+            self.server.server_port)
+        self.api.API_TOKEN = 'token'
+        self.api.API_COMPRESSION = 'none'
+        self.api.API_CONCURRENCY = 3
+        self.api.API_POOL_MAXSIZE = 8
+        self.api.DEBUG = False
+
+        self.rows = [Row(seq, seq) for seq in range(1, 25)]
+
+    def tearDown (self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def expected (self):
+        return [row for row in self.rows if row.seq % 2 == 0]
+
+    def test_upload_keeps_send_order (self):
+        acknowledged = asyncio.run(
+            self.api.upload('test', '/store', self.rows, COLUMNS))
+
+        self.assertEqual(acknowledged, self.expected())
+
+        # Las respuestas han llegado fuera de orden y aun así el resultado
+        # mantiene el orden de envío.
+        self.assertNotEqual(self.server.completed,
+                            sorted(self.server.completed))
+
+    def test_upload_bulk_partial_acknowledgements (self):
+        self.api.API_BATCH_ROWS = 2
+
+        acknowledged = asyncio.run(
+            self.api.upload_bulk('test', '/bulk', self.rows, COLUMNS))
+
+        self.assertEqual(acknowledged, self.expected())
+        self.assertEqual(len(self.server.completed), len(self.rows) // 2)
+
+    def test_in_flight_limit (self):
+        for upload in (self.api.upload, self.api.upload_bulk):
+            self.server.max_in_flight = 0
+            self.api.API_BATCH_ROWS = 1
+
+            asyncio.run(upload('test', '/store', self.rows, COLUMNS))
+
+            self.assertGreater(self.server.max_in_flight, 1)
+            self.assertLessEqual(self.server.max_in_flight,
+                                 self.api.API_CONCURRENCY)
+
+
+if __name__ == "__main__":
+    unittest.main()
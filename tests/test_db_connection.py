@@ -0,0 +1,169 @@
+#!/usr/bin/python3
+# -*- encoding: utf-8 -*-
+
+# @author     Raúl Caro Pastorino
+# @email      dev@fryntiz.es
+# @web        https://fryntiz.es
+# @gitlab     https://gitlab.com/fryntiz
+# @github     https://github.com/fryntiz
+# @twitter    https://twitter.com/fryntiz
+# @telegram   https://t.me/fryntiz
+
+# Create Date: 2026
+# Project Name:
+# Description:
+#
+# Dependencies:
+#
+# Revision 0.01 - File Created
+# Additional Comments:
+
+# @copyright  Copyright © 2022 Raúl Caro Pastorino
+# @license    https://wwww.gnu.org/licenses/gpl.txt
+
+# Copyright (C) 2022  Raúl Caro Pastorino
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+# Guía de estilos aplicada: PEP8
+
+#######################################
+# #           Descripción           # #
+#######################################
+## Pruebas de DbConnection sobre un SQLite temporal, sin depender de la base
+## de datos configurada en .env.
+##
+## Uso: python3 -m unittest tests.test_db_connection
+##
+
+#######################################
+# #       Importar Librerías        # #
+#######################################
+
+from Models.DbConnection import DbConnection, create_sqlite_engine
+from Models.Pipeline import Pipeline
+from Models.SolarControllers.RenogyRoverLi import RenogyRoverLi
+import contextlib
+import io
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+#######################################
+# #            FUNCIONES            # #
+#######################################
+
+
+class DbConnectionTest(unittest.TestCase):
+
+    def setUp (self):
+        self.directory = tempfile.mkdtemp()
+        self.engine = create_sqlite_engine(
+            os.path.join(self.directory, 'test.sqlite3'))
+        self.model = RenogyRoverLi.tablemodel(None)
+        self.connections = []
+
+        # Las tablas y buffers se guardan en la clase, nombre único por prueba.
+        self.tablename = 'test_' + self._testMethodName
+
+    def tearDown (self):
+        for db in self.connections:
+            db.close_connection()
+
+        self.engine.dispose()
+        shutil.rmtree(self.directory)
+
+    def make_connection (self):
+        """
+        Crea una conexión sobre el SQLite temporal.
+        :return:
+        """
+        db = DbConnection()
+        db.engine = self.engine
+        self.connections.append(db)
+
+        return db
+
+    def make_row (self, device_id):
+        """
+        Tupla en el orden de columnas del modelo como las de build_row().
+        :param device_id: Valor de la primera columna.
+        :return:
+        """
+        return (device_id,) + (None,) * (len(self.model) - 1)
+
+    def test_second_instance_sets_up_tables (self):
+        with contextlib.redirect_stdout(io.StringIO()):
+            for _ in range(2):
+                db = self.make_connection()
+                db.table_set_new(self.tablename, self.model)
+                db.table_save_data(self.tablename, self.make_row(1))
+                db.table_flush(self.tablename)
+
+            self.assertEqual(len(db.table_get_data(self.tablename)), 2)
+
+    def test_pipeline_flushes_buffer_on_time (self):
+        db = self.make_connection()
+        db.DB_BUFFER_ROWS = 100
+        db.DB_BUFFER_SECONDS = 0.2
+
+        pipeline = Pipeline(db, setup=lambda: db.table_set_new(
+            self.tablename, self.model))
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            pipeline.start()
+            pipeline.submit(self.tablename, self.make_row(1))
+
+            # Sin más lecturas el buffer se vuelca al vencer el tiempo.
+            deadline = time.monotonic() + 2
+            stored = []
+
+            while not stored and time.monotonic() < deadline:
+                time.sleep(0.05)
+                stored = db.table_get_data(self.tablename)
+
+            pipeline.stop()
+
+        self.assertEqual(len(stored), 1)
+
+    def test_failed_flush_keeps_rows (self):
+        db = self.make_connection()
+        db.DB_BUFFER_ROWS = 2
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            db.table_set_new(self.tablename, self.model)
+
+            # Base de datos caída durante el primer volcado.
+            db.get_connection = lambda: self.fail_connection()
+
+            for device_id in range(3):
+                db.table_save_data(self.tablename, self.make_row(device_id))
+
+            self.assertEqual(len(db.buffers[self.tablename]), 3)
+
+            del db.get_connection
+            db.table_flush(self.tablename)
+
+            stored = db.table_get_data(self.tablename)
+
+        self.assertEqual([row.device_id for row in stored], [0, 1, 2])
+
+    def fail_connection (self):
+        raise OSError('DB no disponible')
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/python3
+# -*- encoding: utf-8 -*-
+
+# @author     Raúl Caro Pastorino
+# @email      dev@fryntiz.es
+# @web        https://fryntiz.es
+# @gitlab     https://gitlab.com/fryntiz
+# @github     https://github.com/fryntiz
+# @twitter    https://twitter.com/fryntiz
+# @telegram   https://t.me/fryntiz
+
+# Create Date: 2026
+# Project Name:
+# Description:
+#
+# Dependencies:
+#
+# Revision 0.01 - File Created
+# Additional Comments:
+
+# @copyright  Copyright © 2022 Raúl Caro Pastorino
+# @license    https://wwww.gnu.org/licenses/gpl.txt
+
+# Copyright (C) 2022  Raúl Caro Pastorino
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+# Guía de estilos aplicada: PEP8
+
+#######################################
+# #           Descripción           # #
+#######################################
+## Pruebas de PollScheduler: la primera marca no cuenta como retrasada con o
+## sin alinear (POLL_ALIGN) y con lectura inmediata (POLL_IMMEDIATE).
+##
+## Uso: python3 -m unittest tests.test_poll_scheduler
+##
+
+#######################################
+# #       Importar Librerías        # #
+#######################################
+
+from Models.PollScheduler import PollScheduler
+import time
+import unittest
+
+#######################################
+# #             Variables           # #
+#######################################
+
+# Periodo corto para que las pruebas no tarden, con margen para el sistema.
+PERIOD = 0.2
+TOLERANCE = 0.05
+
+#######################################
+# #            FUNCIONES            # #
+#######################################
+
+
+class PollSchedulerTest(unittest.TestCase):
+
+    def run_ticks (self, scheduler, count=3):
+        """
+        Espera varias marcas y devuelve cuándo ha vuelto cada una.
+        :param scheduler: Planificador a probar.
+        :param count: Cantidad de marcas.
+        :return: Segundos desde el inicio de cada marca.
+        """
+        start = time.monotonic()
+        elapsed = []
+
+        for _ in range(count):
+            scheduler.wait()
+            elapsed.append(time.monotonic() - start)
+
+        return elapsed
+
+    def test_unaligned_first_tick_is_immediate (self):
+        for immediate in (False, True):
+            scheduler = PollScheduler(period=PERIOD, align=False,
+                                      immediate=immediate)
+            elapsed = self.run_ticks(scheduler)
+
+            self.assertEqual(scheduler.overruns, 0)
+            self.assertEqual(scheduler.skipped, 0)
+
+            for number, value in enumerate(elapsed):
+                self.assertAlmostEqual(value, number * PERIOD,
+                                       delta=TOLERANCE)
+
+    def test_aligned_immediate_then_aligned (self):
+        scheduler = PollScheduler(period=PERIOD, align=True, immediate=True)
+        elapsed = self.run_ticks(scheduler)
+        ticks = [scheduler.wait() for _ in range(2)]
+
+        self.assertEqual(scheduler.overruns, 0)
+        self.assertLess(elapsed[0], TOLERANCE)
+
+        # Tras la primera, las marcas caen en múltiplos del periodo.
+        for tick in ticks:
+            self.assertAlmostEqual(round(tick / PERIOD) * PERIOD, tick,
+                                   delta=1e-6)
+
+    def test_aligned_waits_for_aligned_tick (self):
+        scheduler = PollScheduler(period=PERIOD, align=True)
+        tick = scheduler.wait()
+
+        self.assertEqual(scheduler.overruns, 0)
+        self.assertAlmostEqual(round(tick / PERIOD) * PERIOD, tick,
+                               delta=1e-6)
+
+
+if __name__ == "__main__":
+    unittest.main()
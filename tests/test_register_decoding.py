@@ -0,0 +1,239 @@
+#!/usr/bin/python3
+# -*- encoding: utf-8 -*-
+
+# @author     Raúl Caro Pastorino
+# @email      dev@fryntiz.es
+# @web        https://fryntiz.es
+# @gitlab     https://gitlab.com/fryntiz
+# @github     https://github.com/fryntiz
+# @twitter    https://twitter.com/fryntiz
+# @telegram   https://t.me/fryntiz
+
+# Create Date: 2026
+# Project Name:
+# Description:
+#
+# Dependencies:
+#
+# Revision 0.01 - File Created
+# Additional Comments:
+
+# @copyright  Copyright © 2022 Raúl Caro Pastorino
+# @license    https://wwww.gnu.org/licenses/gpl.txt
+
+# Copyright (C) 2022  Raúl Caro Pastorino
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>
+
+# Guía de estilos aplicada: PEP8
+
+#######################################
+# #           Descripción           # #
+#######################################
+## Pruebas de la decodificación de registros del modelo RenogyRoverLi con
+## volcados sintéticos: contadores de 32 bits, temperaturas con bit de signo,
+## el unpack struct frente a la decodificación campo a campo y el cálculo de
+## los getters originales del modelo.
+##
+## Uso: python3 -m unittest tests.test_register_decoding
+##
+
+#######################################
+# #       Importar Librerías        # #
+#######################################
+
+from Models.SolarControllers.AbstractModel import RegisterBlockDecoder
+from Models.SolarControllers.RenogyRoverLi import RenogyRoverLi
+import random
+import unittest
+
+#######################################
+# #             Variables           # #
+#######################################
+
+# Bloque de datos en tiempo real e históricos del controlador
+BLOCK_START = 0x0100
+BLOCK_COUNT = 0x22
+
+#######################################
+# #            FUNCIONES            # #
+#######################################
+
+
+def baseline_temperature (bits):
+    """
+    Temperatura como la calculaban los getters originales (b7 signo).
+    :param bits: Byte con la temperatura.
+    :return:
+    """
+    return -(bits - 128) if bits >> 7 == 1 else bits
+
+
+# Cálculo de cada campo copiado de los getters originales del modelo, sobre
+# la lista de registros leída en la dirección del campo. Los contadores
+# históricos de 4 bytes devolvían solo la palabra baja (response[1]).
+BASELINE_GETTERS = {
+    'system_voltage_current': lambda r: r[0] >> 8,
+    'system_intensity_current': lambda r: r[0] & 0x00ff,
+    'hardware': lambda r: 'V{}.{}.{}'.format(r[2] & 0x00ff, r[3] >> 8,
+                                             r[3] & 0x00ff),
+    'version': lambda r: 'V{}.{}.{}'.format(r[0] & 0x00ff, r[1] >> 8,
+                                            r[1] & 0x00ff),
+    'serial_number': lambda r: '{}{}'.format(r[0], r[1]),
+    'battery_percentage': lambda r: r[0],
+    'battery_voltage': lambda r: float(r[0]) / 10,
+    'battery_temperature': lambda r: baseline_temperature(r[0] & 0x00ff),
+    'controller_temperature': lambda r: baseline_temperature(r[0] >> 8),
+    'load_voltage': lambda r: float(r[0]) / 10,
+    'load_current': lambda r: float(r[0]) / 100,
+    'load_power': lambda r: r[0],
+    'solar_voltage': lambda r: float(r[0]) / 10,
+    'solar_current': lambda r: float(r[0]) / 100,
+    'solar_power': lambda r: r[0],
+    'today_battery_min_voltage': lambda r: float(r[0]) / 10,
+    'today_battery_max_voltage': lambda r: float(r[0]) / 10,
+    'today_max_charging_current': lambda r: float(r[0]) / 100,
+    'today_max_discharging_current': lambda r: float(r[0]) / 100,
+    'today_max_charging_power': lambda r: r[0],
+    'today_max_discharging_power': lambda r: r[0],
+    'today_charging_amp_hours': lambda r: r[0],
+    'today_discharging_amp_hours': lambda r: r[0],
+    'today_power_generation': lambda r: r[0],
+    'today_power_consumption': lambda r: r[0],
+    'historical_total_days_operating': lambda r: r[0],
+    'historical_total_number_battery_over_discharges': lambda r: r[0],
+    'historical_total_number_battery_full_charges': lambda r: r[0],
+    'historical_total_charging_amp_hours': lambda r: r[1],
+    'historical_total_discharging_amp_hours': lambda r: r[1],
+    'historical_cumulative_power_generation': lambda r: r[1],
+    'historical_cumulative_power_consumption': lambda r: r[1],
+    'charging_status': lambda r: r[0] & 0x00ff,
+    'nominal_battery_capacity': lambda r: r[0],
+    'battery_type': lambda r: RenogyRoverLi.BATTERY_TYPE.get(r[0]),
+}
+
+
+
+class RegisterDecodingTest(unittest.TestCase):
+
+    def setUp (self):
+        self.model = RenogyRoverLi(serial=object())
+        self.block = RegisterBlockDecoder(self.model, BLOCK_START,
+                                          BLOCK_COUNT)
+
+    def decode_both (self, words):
+        """
+        Decodifica el bloque con struct y campo a campo.
+        :param words: Registros del bloque.
+        :return: Tupla con los resultados de ambos caminos.
+        """
+        registers = dict(enumerate(words, BLOCK_START))
+        names = set(self.block.names) | \
+            {name for name, *_ in self.block.fallback}
+
+        return (self.block.decode_words(words),
+                self.model.decode_registers(registers, names))
+
+    def assert_block (self, words, expected):
+        for datas in self.decode_both(words):
+            for name, value in expected.items():
+                self.assertEqual(datas[name], value, name)
+
+    def test_32_bit_counters (self):
+        words = [0] * BLOCK_COUNT
+        words[0x0118 - BLOCK_START] = 0x0001
+        words[0x0119 - BLOCK_START] = 0x86A0
+        words[0x011C - BLOCK_START] = 0xFFFF
+        words[0x011D - BLOCK_START] = 0xFFFF
+        words[0x011E - BLOCK_START] = 0x0000
+        words[0x011F - BLOCK_START] = 0xFFFF
+
+        self.assert_block(words, {
+            'historical_total_charging_amp_hours': 100000,
+            'historical_total_discharging_amp_hours': 0,
+            'historical_cumulative_power_generation': 0xFFFFFFFF,
+            'historical_cumulative_power_consumption': 0xFFFF,
+        })
+
+    def test_signed_temperatures (self):
+        words = [0] * BLOCK_COUNT
+        words[0x0101 - BLOCK_START] = 128
+
+        # Controlador 25 ºC (byte alto) y batería -5 ºC (byte bajo).
+        words[0x0103 - BLOCK_START] = 0x1985
+        self.assert_block(words, {
+            'battery_voltage': 12.8,
+            'battery_temperature': -5,
+            'controller_temperature': 25,
+        })
+
+        # Controlador -12 ºC y batería 0 ºC.
+        words[0x0103 - BLOCK_START] = 0x8C00
+        self.assert_block(words, {
+            'battery_temperature': 0,
+            'controller_temperature': -12,
+        })
+
+    def test_struct_matches_per_field (self):
+        for seed in range(50):
+            rnd = random.Random(seed)
+            words = [rnd.randint(0, 0xffff) for _ in range(BLOCK_COUNT)]
+            packed, fields = self.decode_both(words)
+
+            self.assertEqual(packed, fields)
+
+    def test_serial_number_uses_two_registers (self):
+        datas = self.model.decode_registers(
+            {0x18: 2106, 0x19: 1042, 0x1A: 1, 0x1B: 0}, ['serial_number'])
+
+        self.assertEqual(datas['serial_number'], '21061042')
+
+    def test_matches_baseline_getters (self):
+        """
+        Con volcados aleatorios de todos los registros la decodificación
+        desde sectionMap da lo mismo que los getters originales. De los
+        contadores históricos, ahora de 32 bits, se compara la palabra baja
+        que era lo que devolvían antes.
+        """
+        for seed in range(20):
+            rnd = random.Random(seed)
+            registers = {}
+
+            for name in BASELINE_GETTERS:
+                scheme = self.model.sectionMap[name]
+
+                for address in range(scheme['address'],
+                                     scheme['address'] + scheme['bytes']):
+                    registers.setdefault(address, rnd.randint(0, 0xffff))
+
+            # Algunos tipos de batería conocidos para no comparar solo None.
+            registers[self.model.sectionMap['battery_type']['address']] = \
+                seed % 6
+
+            datas = self.model.decode_registers(registers, BASELINE_GETTERS)
+
+            for name, getter in BASELINE_GETTERS.items():
+                scheme = self.model.sectionMap[name]
+                response = [registers[address] for address in range(
+                    scheme['address'], scheme['address'] + scheme['bytes'])]
+                value = datas[name]
+
+                if scheme.get('words') == 2 and not scheme.get('format'):
+                    value &= 0xffff
+
+                self.assertEqual(value, getter(response), name)
+
+
+if __name__ == "__main__":
+    unittest.main()